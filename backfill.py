@@ -0,0 +1,177 @@
+# backfill.py — Regenerate briefs for archived days from data/raw
+#
+#   python backfill.py --start 2026-06-01 --end 2026-06-30 --workers 4
+#   python backfill.py --last 7 --force            # rebuild even where nothing changed
+#   python backfill.py --offline fixed:0.2 --last 30   # fake_llm.py stand-in, no spend
+#
+# Each day replays its saved raw JSON through dedupe (+ the story index as of
+# that day), translation, tagging and the brief build, then rewrites
+# out/<day>.md, out/<day>.csv and docs/days/<day>.html. data/raw is only read.
+# Stages are checkpointed under .cache/backfill/<day>/ with the same
+# fingerprints main() uses, so a day whose raw data, config, rules and prompt
+# code are unchanged is skipped. Days run in a process pool; every worker
+# draws LLM requests from one shared LLM_RPS token bucket. The site index is
+# rebuilt once at the end, and translations learned by the workers are merged
+# into the memo by this process only.
+# --offline runs in a scratch tree (.cache/backfill-offline by default): its
+# out/, docs/, checkpoints and LLM cache stay there, and the memo isn't
+# touched, so canned replies never reach the real brief or site. The stand-in
+# listens on a fixed port (--offline-port): the endpoint URL is part of the
+# stage fingerprints and the LLM cache key, so a random port would redo every
+# day on every offline run.
+import os, sys, time, shutil, argparse
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import multiprocessing
+import daily_brief as db
+
+BACKFILL_DIR = os.path.join(".cache", "backfill")
+OFFLINE_DIR = os.path.join(".cache", "backfill-offline")
+OFFLINE_PORT = 8799
+
+def _enter_scratch(workdir):
+    """Run from `workdir`: outputs, checkpoints and caches land there; the
+    model and memo are still read from the real tree."""
+    db.SECTION_CLF_PATH = os.path.abspath(db.SECTION_CLF_PATH)
+    db.TRANSLATION_MEMO_PATH = os.path.abspath(db.TRANSLATION_MEMO_PATH)
+    os.makedirs(workdir, exist_ok=True)
+    os.chdir(workdir)
+
+def _init_worker(limiter, base_url, workdir):
+    db._llm_limiter = limiter
+    if base_url:
+        db.client = db.make_client(base_url)
+    if workdir:
+        _enter_scratch(workdir)
+
+def _outputs(day):
+    return [f"out/{day}.md", f"out/{day}.csv", f"docs/days/{day}.html"]
+
+def regenerate_day(day, path, force=False):
+    """Rebuild one archived day; returns a summary dict for the parent."""
+    started = time.monotonic()
+    mark = len(db._llm_calls)
+    ck = db.Checkpoints(day, root=BACKFILL_DIR)
+    if force:
+        shutil.rmtree(ck.dir, ignore_errors=True)
+    try:
+        raw = db.load_raw_items(path)
+    except ValueError as e:
+        return {"day": day, "status": f"unreadable: {e}"}
+
+    index = None
+    if db.STORY_INDEX:
+        index = db.StoryIndex(path=os.devnull)
+        index.bootstrap(day, raw_dir=os.path.dirname(path))
+
+    def dedupe_stage():
+        items = db.dedupe_items(raw)
+        return index.filter(items, day) if index else items
+
+    inputs = db.stage_inputs("dedupe", db.fingerprint(raw)) + [index.digest(day) if index else None]
+    items, digest = ck.run("dedupe", inputs, dedupe_stage)
+    if not items:
+        return {"day": day, "status": "no items"}
+    had_en = {id(it) for it in items if it.get("title_en")}
+    db.llm_budget.start()
+    # as in main(): degraded, skipped or failed LLM output isn't checkpointed
+    step = db.llm_calls_mark()
+    items, digest = ck.run("translate", db.stage_inputs("translate", digest),
+                        lambda: db.translate_non_english(items, save_memo=False),
+                        keep=lambda _: db.llm_calls_clean(step))
+    learned = [(it["title"], it.get("language") or "auto", it["title_en"]) for it in items
+               if it.get("title_en") and id(it) not in had_en and it.get("title")]
+    items = db.annotate_items(items)
+    step = db.llm_calls_mark()
+    md_text, _ = ck.run("build", db.stage_inputs("build", digest), lambda: db.build_brief(items),
+                     keep=lambda _: db.llm_calls_clean(step))
+
+    unchanged = "build" in ck.resumed and all(os.path.exists(p) for p in _outputs(day))
+    if not unchanged:
+        os.makedirs("out", exist_ok=True)
+        with open(f"out/{day}.md", "w", encoding="utf-8") as f:
+            f.write(md_text)
+        db.save_csv(items, day)
+        db.write_day_page(md_text, day)
+    with db._llm_calls_lock:
+        calls = db._llm_calls[mark:]
+    total = db.summarize_llm_calls(calls)["total"]
+    return {"day": day, "status": "unchanged" if unchanged else "rebuilt", "items": len(items),
+            "resumed": list(ck.resumed), "calls": total["calls"], "cached": total["cached"],
+            "cost_usd": total["cost_usd"], "wall_s": round(time.monotonic() - started, 1),
+            "translations": learned if "translate" not in ck.resumed else []}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Regenerate archived briefs from data/raw")
+    parser.add_argument("--start", help="first day (YYYY-MM-DD)")
+    parser.add_argument("--end", help="last day (YYYY-MM-DD)")
+    parser.add_argument("--last", type=int, help="only the N most recent days")
+    parser.add_argument("--workers", type=int, default=max(1, min(4, os.cpu_count() or 1)))
+    parser.add_argument("--force", action="store_true", help="rebuild days even when nothing changed")
+    parser.add_argument("--max-minutes", type=float, default=0,
+                        help="stop starting new days after this long (0 = no limit)")
+    parser.add_argument("--offline", metavar="LATENCY", help="serve LLM calls from fake_llm.py (e.g. fixed:0.2)")
+    parser.add_argument("--offline-dir", default=OFFLINE_DIR, help="scratch tree for --offline output")
+    parser.add_argument("--offline-port", type=int, default=OFFLINE_PORT, help="local port for the --offline stand-in")
+    args = parser.parse_args(argv)
+
+    days = [(day, os.path.abspath(path)) for day, path in db.archived_days(args.start, args.end, args.last)]
+    if not days:
+        sys.exit("no archived days in range")
+    base_url = workdir = None
+    if args.offline:
+        import fake_llm
+        try:
+            base_url = fake_llm.serve_in_thread(fake_llm.Config(args.offline), port=args.offline_port)
+        except OSError as e:
+            sys.exit(f"can't serve the offline LLM on port {args.offline_port}: {e} (try --offline-port)")
+        workdir = os.path.abspath(args.offline_dir)
+        print(f"[Backfill] offline LLM at {base_url} ({args.offline}); writing to {workdir}")
+    ctx = multiprocessing.get_context("spawn")
+    limiter = db.SharedTokenBucket(db.LLM_RPS, ctx=ctx)
+    print(f"[Backfill] {len(days)} days ({days[0][0]} .. {days[-1][0]}), {args.workers} workers, "
+          f"LLM {db.LLM_RPS:g} req/s shared")
+
+    started = time.monotonic()
+    deadline = started + args.max_minutes * 60 if args.max_minutes else None
+    results, pending, queue = [], set(), list(days)
+    with ProcessPoolExecutor(args.workers, mp_context=ctx, initializer=_init_worker,
+                             initargs=(limiter, base_url, workdir)) as pool:
+        while queue or pending:
+            while queue and len(pending) < args.workers and (deadline is None or time.monotonic() < deadline):
+                day, path = queue.pop(0)
+                pending.add(pool.submit(regenerate_day, day, path, args.force))
+            if not pending:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                try:
+                    r = fut.result()
+                except Exception as e:
+                    r = {"day": "?", "status": f"error: {e}"}
+                results.append(r)
+                extra = (f", {r['items']} items, {r['calls']} LLM calls ({r['cached']} cached), "
+                         f"${r['cost_usd']:.4f}, {r['wall_s']}s"
+                         + (f", reused {'+'.join(r['resumed'])}" if r["resumed"] else "")) if "items" in r else ""
+                print(f"[Backfill] {r['day']}: {r['status']}{extra}")
+
+    if workdir:
+        _enter_scratch(workdir)
+    learned = [t for r in results for t in r.get("translations", [])]
+    if learned and not workdir:  # fake_llm translations never go into the real memo
+        memo = db.TranslationMemo(db.TRANSLATION_MEMO_PATH, db.TRANSLATION_MEMO_MAX)
+        for title, lang, text in learned:
+            memo.put(title, lang, text)
+        memo.save()
+    rebuilt = [r for r in results if r["status"] == "rebuilt"]
+    if rebuilt:
+        db.write_site_index()
+    skipped = [d for d, _ in queue]
+    print(f"[Backfill] {len(rebuilt)} rebuilt, {sum(r['status'] == 'unchanged' for r in results)} unchanged, "
+          f"{len(results) - len(rebuilt) - sum(r['status'] == 'unchanged' for r in results)} other"
+          + (f", {len(skipped)} not started (time limit)" if skipped else "")
+          + f"; {sum(r.get('calls', 0) for r in results)} LLM calls, "
+          f"${sum(r.get('cost_usd', 0.0) for r in results):.4f}, {len(learned)} new translations"
+          + (" (offline, not saved)" if workdir else "") + f", {time.monotonic() - started:.0f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,444 @@
+# bench.py — Benchmarks over the archived days in data/raw
+#
+#   python bench.py why-modes --last 5     # fan-out vs single-call "Why this matters"
+#   python bench.py --offline "lognormal:1.2,0.5" why-modes --last 30
+#   python bench.py classify               # regex tagger throughput over all of data/raw
+#   python bench.py tag-batch --out tags.csv   # multi-label re-tag of the archive via the automaton
+#   python bench.py section-clf --last 30  # trained classifier vs the regex tagger (needs numpy + a model)
+#   python bench.py near-dup --thresholds 0.4,0.5,0.6 --show 5   # MinHash/LSH clustering per threshold
+#   python bench.py dedupe-keys --show 10  # ASCII-stripped vs Unicode dedupe keys: merges, speed, size
+#   python bench.py translate-routing      # per day: headlines sent for translation that were already English
+#   python bench.py story-index --last 30  # replay days through the cross-day index: repeats per day
+#   python bench.py url-dupes              # duplicate rate by raw vs canonical URL across the archive
+#
+# LLM benchmarks make real calls through daily_brief.client; --offline starts
+# fake_llm.py in-process with the given latency spec so nothing is spent. The
+# response cache is always bypassed.
+import os, re, sys, csv, time, argparse
+from collections import Counter
+os.environ["LLM_CACHE"] = "0"  # read at import time; cached replies would make timings meaningless
+import daily_brief as db
+
+archived_days = db.archived_days
+
+def load_day(path):
+    """Raw items for a day; unreadable archive files are reported and skipped."""
+    try:
+        return db.load_raw_items(path)
+    except ValueError as e:
+        print(f"[bench] skipping {path}: {e}", file=sys.stderr)
+        return []
+
+def _calls_since(mark):
+    with db._llm_calls_lock:
+        return db._llm_calls[mark:]
+
+def archived_titles(days):
+    titles = []
+    for _, path in days:
+        for it in load_day(path):
+            title = (it.get("title_en") or it.get("title") or "").strip()
+            if title:
+                titles.append(title)
+    return titles
+
+def _rate(fn, titles, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        out = fn(titles)
+        best = min(best, time.perf_counter() - started)
+    return out, len(titles) / best
+
+# ---------- classify ----------
+def _legacy_classify(title):
+    """The original is_noise + choose_section: up to ~15 re.search scans per title."""
+    t = title.lower()
+    for pat in db.NOISE_PATTERNS:
+        if re.search(pat, t):
+            return "noise"
+    for section, patterns in db.TAG_KEYWORDS.items():
+        for pat in patterns:
+            if re.search(pat, t):
+                return section
+    return "Other"
+
+def bench_classify(args):
+    titles = archived_titles(archived_days(args.start, args.end, args.last))
+    legacy, legacy_rate = _rate(lambda ts: [_legacy_classify(t) for t in ts], titles, args.repeat)
+    fast, fast_rate = _rate(lambda ts: [db.classify_title(t) for t in ts], titles, args.repeat)
+    mismatches = sum(a != b for a, b in zip(legacy, fast))
+    print(f"titles:          {len(titles)}")
+    print(f"legacy regex:    {legacy_rate:,.0f} titles/s")
+    print(f"single pass:     {fast_rate:,.0f} titles/s ({fast_rate / legacy_rate:.2f}x)")
+    print(f"disagreements:   {mismatches}")
+
+# ---------- tag-batch ----------
+def _regex_multilabel(titles):
+    """Every label hit per title by searching each rule on its own."""
+    out = []
+    for title in titles:
+        t = title.lower()
+        out.append({label for label, pat in db._CLASSIFY_RULES if re.search(pat, t)})
+    return out
+
+def bench_tag_batch(args):
+    days = archived_days(args.start, args.end, args.last)
+    titles = archived_titles(days)
+    tagger = db.keyword_tagger
+    regex_hits, regex_rate = _rate(_regex_multilabel, titles, args.repeat)
+    ac_hits, ac_rate = _rate(tagger.tag_batch, titles, args.repeat)
+    print(f"titles:            {len(titles)}")
+    print(f"rules:             {len(db._CLASSIFY_RULES)} ({len(tagger.goto)} automaton states, "
+          f"{len(tagger.residual)} residual regexes)")
+    print(f"per-rule regex:    {regex_rate:,.0f} titles/s (all labels)")
+    print(f"automaton:         {ac_rate:,.0f} titles/s ({ac_rate / regex_rate:.2f}x)")
+    print(f"label-set diffs:   {sum(a != b for a, b in zip(regex_hits, ac_hits))}")
+    print(f"primary vs first-match tagger diffs: "
+          f"{sum(tagger.primary(h) != db.classify_title(t) for h, t in zip(ac_hits, titles))}")
+    multi = sum(len(h - {'noise'}) > 1 for h in ac_hits)
+    print(f"titles with 2+ sections: {multi} ({multi / max(1, len(titles)):.1%})")
+    if args.out:
+        with open(args.out, "w", newline="", encoding="utf-8") as f:
+            w = csv.writer(f)
+            w.writerow(["day", "title", "primary", "labels"])
+            for day, path in days:
+                items = [it for it in load_day(path) if (it.get("title_en") or it.get("title") or "").strip()]
+                day_titles = [(it.get("title_en") or it.get("title")).strip() for it in items]
+                for title, hits in zip(day_titles, tagger.tag_batch(day_titles)):
+                    w.writerow([day, title, tagger.primary(hits),
+                                "|".join(l for l in tagger.labels if l in hits)])
+        print(f"wrote {args.out}")
+
+# ---------- section-clf ----------
+def bench_section_clf(args):
+    db.SECTION_CLF = True  # measure the trained model even when runs leave it off
+    clf = db.section_classifier()
+    if clf is None:
+        sys.exit(f"no classifier: needs numpy and {db.SECTION_CLF_PATH} (python train_classifier.py)")
+    titles = archived_titles(archived_days(args.start, args.end, args.last))
+    regex, regex_rate = _rate(lambda ts: [db.classify_title(t) for t in ts], titles, args.repeat)
+    preds, clf_rate = _rate(clf.predict, titles, args.repeat)
+    named = [(p, r) for p, r in zip(preds, regex) if r not in ("noise", "Other")]
+    others = [p for p, r in zip(preds, regex) if r == "Other"]
+    moved = [label for label, prob in others if label != "Other" and prob >= db.SECTION_CLF_MIN_PROB]
+    print(f"titles:            {len(titles)}")
+    print(f"regex tagger:      {regex_rate:,.0f} titles/s")
+    print(f"classifier:        {clf_rate:,.0f} titles/s batched ({clf_rate / regex_rate:.2f}x)")
+    print(f"agreement (named): {sum(p == r for (p, _), r in named) / max(1, len(named)):.1%} of {len(named)}")
+    print(f"'Other' moved:     {len(moved)}/{len(others)} at p>={db.SECTION_CLF_MIN_PROB:g}")
+    for section in db.SECTION_ORDER:
+        if moved.count(section):
+            print(f"  {section:<24}{moved.count(section):>6}")
+
+# ---------- near-dup ----------
+def _all_pairs_clusters(titles, threshold):
+    """Reference clustering: exact Jaccard over every pair."""
+    shingles = [db.title_shingles(t) for t in titles]
+    parent = list(range(len(titles)))
+    def find(i):
+        while parent[i] != i:
+            i = parent[i]
+        return i
+    for i in range(len(titles)):
+        for j in range(i + 1, len(titles)):
+            if db.jaccard(shingles[i], shingles[j]) >= threshold:
+                parent[max(find(i), find(j))] = min(find(i), find(j))
+    return len({find(i) for i in range(len(titles))})
+
+def bench_near_dup(args):
+    days = [(day, db.dedupe_items(load_day(path), near_dup_threshold=0)) for day, path in
+            archived_days(args.start, args.end, args.last)]
+    days = [(day, items) for day, items in days if items]
+    lsh = db.MinHashLSH(args.bands, args.rows)
+    print(f"{len(days)} days, {sum(len(i) for _, i in days)} items after exact dedupe; "
+          f"LSH {args.bands} bands x {args.rows} rows")
+    print(f"{'threshold':>9}{'kept':>8}{'removed':>9}{'ms/day':>8}{'clusters>1':>11}{'recall':>8}")
+    for threshold in [float(t) for t in args.thresholds.split(",")]:
+        kept = merged = 0
+        elapsed = 0.0
+        exact_kept = 0
+        samples = []
+        for day, items in days:
+            titles = [(it.get("title_en") or it.get("title") or "").strip() for it in items]
+            started = time.perf_counter()
+            clusters = db.near_duplicate_clusters(titles, threshold, lsh)
+            elapsed += time.perf_counter() - started
+            kept += len(clusters)
+            merged += sum(len(c) > 1 for c in clusters)
+            samples += [[titles[i] for i in c] for c in clusters if len(c) > 1 and len(titles[c[0]].split()) >= 6][:1]
+            if args.recall:
+                exact_kept += _all_pairs_clusters(titles, threshold)
+        total = sum(len(i) for _, i in days)
+        # recall: share of the all-pairs merges that LSH also found
+        recall = f"{(total - kept) / max(1, total - exact_kept):.1%}" if args.recall else "-"
+        print(f"{threshold:>9g}{kept:>8}{(total - kept) / max(1, total):>9.1%}"
+              f"{1000 * elapsed / max(1, len(days)):>8.1f}{merged:>11}{recall:>8}")
+        for cluster in samples[:args.show]:
+            print("    | " + "\n    | ".join(t[:100] for t in cluster[:4]))
+            print()
+
+# ---------- dedupe-keys ----------
+def _legacy_dedupe_key(it):
+    """The original key: lowercase, strip everything outside [a-z0-9 ]."""
+    title = (it.get("title_en") or it.get("title") or "").strip().lower()
+    norm = re.sub(r"\s+", " ", re.sub(r"[^a-z0-9 ]", "", title))
+    return norm or (it.get("url") or "") or None
+
+def bench_dedupe_keys(args):
+    days = [(day, load_day(path)) for day, path in archived_days(args.start, args.end, args.last)]
+    items = [it for _, day_items in days for it in day_items]
+    legacy_keys, legacy_rate = _rate(lambda its: [_legacy_dedupe_key(it) for it in its], items, args.repeat)
+    keys, rate = _rate(lambda its: [db.dedupe_key(it) for it in its], items, args.repeat)
+    # Per-day merges: an item is merged when an earlier item that day has the same key
+    split, joined, kept_legacy, kept = [], [], 0, 0
+    offset = 0
+    for day, day_items in days:
+        first_legacy, first = {}, {}
+        for i, it in enumerate(day_items, offset):
+            lk, k = legacy_keys[i], keys[i]
+            if lk is not None and lk not in first_legacy:
+                first_legacy[lk] = i
+                kept_legacy += 1
+            if k is not None and k not in first:
+                first[k] = i
+                kept += 1
+            if lk is not None and first_legacy[lk] != i and (k is None or first[k] == i):
+                split.append((day, items[first_legacy[lk]], it))
+            elif k is not None and first[k] != i and (lk is None or first_legacy[lk] == i):
+                joined.append((day, items[first[k]], it))
+        offset += len(day_items)
+    print(f"items:              {len(items)} over {len(days)} days")
+    print(f"legacy key:         {legacy_rate:,.0f} items/s, kept {kept_legacy}, "
+          f"avg key {sum(sys.getsizeof(k) for k in legacy_keys if k) / max(1, len(items)):.0f} B")
+    print(f"unicode digest key: {rate:,.0f} items/s, kept {kept}, "
+          f"avg key {sum(sys.getsizeof(k) for k in keys if k) / max(1, len(items)):.0f} B")
+    # data/raw was written after legacy dedupe, so same-day false merges are
+    # already gone; archive-wide, distinct titles sharing a legacy key show them
+    by_legacy = {}
+    for it, lk, k in zip(items, legacy_keys, keys):
+        if lk is not None and k is not None:
+            by_legacy.setdefault(lk, {}).setdefault(k, it)
+    collisions = [list(group.values()) for group in by_legacy.values() if len(group) > 1]
+    print(f"legacy false merges now kept apart: {len(split)} same-day; "
+          f"{len(collisions)} legacy keys shared by {sum(map(len, collisions))} distinct titles archive-wide")
+    split += [("archive", group[0], group[1]) for group in
+              sorted(collisions, key=lambda g: -len(g))]
+    print(f"new merges (same tokens after NFKC/casefold): {len(joined)}")
+    for label, pairs in (("kept apart", split), ("newly merged", joined)):
+        for day, a, b in pairs[:args.show]:
+            ta = (a.get("title_en") or a.get("title") or "")[:70]
+            tb = (b.get("title_en") or b.get("title") or "")[:70]
+            print(f"  {label} {day}: {ta!r}\n  {' ' * (len(label) + 12)}{tb!r}")
+
+# ---------- translate-routing ----------
+def _legacy_is_non_english_text(text):
+    """The original detector: any of nine ranges (incl. all accented Latin) in the first 50 chars."""
+    for ch in text[:50]:
+        cp = ord(ch)
+        if any([0x4E00 <= cp <= 0x9FFF, 0xAC00 <= cp <= 0xD7AF, 0x0400 <= cp <= 0x04FF,
+                0x0600 <= cp <= 0x06FF, 0x0370 <= cp <= 0x03FF, 0x0080 <= cp <= 0x024F,
+                0x1E00 <= cp <= 0x1EFF, 0x3040 <= cp <= 0x309F, 0x30A0 <= cp <= 0x30FF]):
+            return True
+    return False
+
+def _legacy_routed(it):
+    lang = it.get("language") or ""
+    return bool((lang and lang != "en") or _legacy_is_non_english_text(it["title"]))
+
+def _already_english(it):
+    """The provider said English, or the stored translation came back unchanged."""
+    if db.normalize_language(it.get("language")) == "en":
+        return True
+    en = it.get("title_en")
+    return bool(en) and " ".join(en.split()).casefold() == " ".join(it["title"].split()).casefold()
+
+def bench_translate_routing(args):
+    totals = {"items": 0, "legacy": 0, "legacy_en": 0, "new": 0, "new_en": 0}
+    legacy_t = new_t = 0.0
+    print(f"{'day':<12}{'items':>7}{'legacy':>8}{'of which EN':>12}{'new':>7}{'of which EN':>12}")
+    for day, path in archived_days(args.start, args.end, args.last):
+        items = [it for it in load_day(path) if it.get("title")]
+        if not items:
+            continue
+        started = time.perf_counter()
+        legacy = [_legacy_routed(it) for it in items]
+        legacy_t += time.perf_counter() - started
+        started = time.perf_counter()
+        profiles = db.script_profiles([it["title"] for it in items])
+        new = [db.needs_translation(p, it.get("language")) for p, it in zip(profiles, items)]
+        new_t += time.perf_counter() - started
+        english = [_already_english(it) for it in items]
+        row = {"items": len(items), "legacy": sum(legacy), "legacy_en": sum(l and e for l, e in zip(legacy, english)),
+               "new": sum(new), "new_en": sum(n and e for n, e in zip(new, english))}
+        for k, v in row.items():
+            totals[k] += v
+        if args.per_day:
+            print(f"{day:<12}{row['items']:>7}{row['legacy']:>8}{row['legacy_en']:>12}{row['new']:>7}{row['new_en']:>12}")
+    t = totals
+    print(f"{'total':<12}{t['items']:>7}{t['legacy']:>8}{t['legacy_en']:>12}{t['new']:>7}{t['new_en']:>12}")
+    print(f"already-English headlines sent to the LLM: legacy {t['legacy_en'] / max(1, t['legacy']):.1%} "
+          f"of routed, new {t['new_en'] / max(1, t['new']):.1%}")
+    print(f"routing speed: legacy {t['items'] / max(legacy_t, 1e-9):,.0f} titles/s, "
+          f"batched script profiles {t['items'] / max(new_t, 1e-9):,.0f} titles/s")
+
+# ---------- story-index ----------
+def bench_story_index(args):
+    index = db.StoryIndex(path=os.devnull, retention_days=args.days)
+    totals = Counter()
+    elapsed = 0.0
+    print(f"{'day':<12}{'items':>7}{'repeats':>9}{'url':>6}{'title':>7}{'near-dup':>10}")
+    for day, path in archived_days(args.start, args.end, args.last):
+        items = db.dedupe_items(load_day(path))
+        if not items:
+            continue
+        started = time.perf_counter()
+        hits = [index.seen(it, day) for it in items]
+        elapsed += time.perf_counter() - started
+        reasons = Counter(h[1] for h in hits if h)
+        print(f"{day:<12}{len(items):>7}{sum(reasons.values()):>9}{reasons['url']:>6}"
+              f"{reasons['title']:>7}{reasons['near-dup']:>10}")
+        totals.update(reasons)
+        totals["items"] += len(items)
+        index.add_day(day, items)
+    repeats = totals["url"] + totals["title"] + totals["near-dup"]
+    print(f"total: {repeats}/{totals['items']} repeats ({repeats / max(1, totals['items']):.1%}) "
+          f"within {args.days} days; lookup {1e6 * elapsed / max(1, totals['items']):.0f} us/item; "
+          f"{len(index.story_day)} stories indexed at the end")
+
+# ---------- url-dupes ----------
+def bench_url_dupes(args):
+    days = [(day, load_day(path)) for day, path in archived_days(args.start, args.end, args.last)]
+    items = [(day, it) for day, day_items in days for it in day_items if it.get("url")]
+    urls = [it["url"].strip() for _, it in items]
+    canon, rate = _rate(lambda us: [db.canonical_url(u) for u in us], urls, args.repeat)
+    first_day = {}
+    same_day = cross_day = 0
+    variants = {}
+    for (day, _), raw, c in zip(items, urls, canon):
+        variants.setdefault(c, set()).add(raw)
+        seen = first_day.get(c)
+        if seen is None:
+            first_day[c] = day
+        elif seen == day:
+            same_day += 1
+        else:
+            cross_day += 1
+    # same-day URL merges the title key alone missed (data/raw is already title-deduped)
+    url_merges = sum(len(day_items) - len(db.dedupe_items([dict(it) for it in day_items], near_dup_threshold=0))
+                     for _, day_items in days)
+    n = max(1, len(items))
+    multi = [v for v in variants.values() if len(v) > 1]
+    print(f"items with a URL:        {len(items)} over {len(days)} days")
+    print(f"distinct raw URLs:       {len(set(urls))}")
+    print(f"distinct canonical URLs: {len(first_day)} ({len(multi)} with 2+ raw variants)")
+    print(f"duplicate rate:          {(same_day + cross_day) / n:.2%} "
+          f"(same day {same_day / n:.2%}, earlier day {cross_day / n:.2%})")
+    print(f"same-day merges the URL key adds to title dedupe: {url_merges}")
+    print(f"canonical_url:           {rate:,.0f} URLs/s")
+    for v in sorted(multi, key=len, reverse=True)[:args.show]:
+        print("  " + "\n  ".join(sorted(v)[:4]) + "\n")
+
+# ---------- why-modes ----------
+def bench_why_modes(args):
+    totals = {}
+    print(f"{'day':<12}{'mode':<8}{'calls':>6}{'wall_s':>9}{'prompt':>9}{'compl':>9}{'cost$':>9}")
+    for day, path in archived_days(args.start, args.end, args.last):
+        items = db.dedupe_items(load_day(path))
+        grouped = db.group_by_section(items)
+        if not any(grouped.values()):
+            continue
+        for mode in ("fanout", "single"):
+            mark = len(db._llm_calls)
+            started = time.monotonic()
+            db.build_sections(grouped, mode=mode)
+            wall = time.monotonic() - started
+            s = db.summarize_llm_calls(_calls_since(mark))["total"]
+            print(f"{day:<12}{mode:<8}{s['calls']:>6}{wall:>9.1f}{s['prompt_tokens']:>9}"
+                  f"{s['completion_tokens']:>9}{s['cost_usd']:>9.4f}")
+            t = totals.setdefault(mode, {"days": 0, "wall_s": 0.0, "calls": 0, "prompt": 0, "compl": 0, "cost": 0.0})
+            t["days"] += 1
+            t["wall_s"] += wall
+            t["calls"] += s["calls"]
+            t["prompt"] += s["prompt_tokens"]
+            t["compl"] += s["completion_tokens"]
+            t["cost"] += s["cost_usd"]
+    print()
+    for mode, t in totals.items():
+        n = t["days"] or 1
+        print(f"{mode:<8} per day: {t['wall_s'] / n:.1f}s wall, {t['calls'] / n:.1f} calls, "
+              f"{t['prompt'] / n:.0f}+{t['compl'] / n:.0f} tokens, ${t['cost'] / n:.4f}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks over archived days")
+    parser.add_argument("--offline", metavar="LATENCY",
+                        help="serve LLM calls from fake_llm.py with this latency spec (e.g. fixed:0.5)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="with --offline: injected error rate")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    def add_days(p):
+        p.add_argument("--start", help="first day (YYYY-MM-DD)")
+        p.add_argument("--end", help="last day (YYYY-MM-DD)")
+        p.add_argument("--last", type=int, help="only the N most recent days")
+
+    p = sub.add_parser("why-modes", help="fan-out vs single JSON call for 'Why this matters'")
+    add_days(p)
+    p.set_defaults(func=bench_why_modes)
+
+    p = sub.add_parser("classify", help="legacy vs precompiled single-pass noise/section tagging")
+    add_days(p)
+    p.add_argument("--repeat", type=int, default=3)
+    p.set_defaults(func=bench_classify)
+
+    p = sub.add_parser("tag-batch", help="multi-label tagging: keyword automaton vs per-rule regex")
+    add_days(p)
+    p.add_argument("--repeat", type=int, default=1)
+    p.add_argument("--out", help="write every archived title's labels to this CSV")
+    p.set_defaults(func=bench_tag_batch)
+
+    p = sub.add_parser("section-clf", help="trained section classifier: throughput, agreement, 'Other' moves")
+    add_days(p)
+    p.add_argument("--repeat", type=int, default=1)
+    p.set_defaults(func=bench_section_clf)
+
+    p = sub.add_parser("near-dup", help="MinHash/LSH near-duplicate clustering per Jaccard threshold")
+    add_days(p)
+    p.add_argument("--thresholds", default="0.4,0.5,0.6,0.7,0.8")
+    p.add_argument("--bands", type=int, default=db.MINHASH_BANDS)
+    p.add_argument("--rows", type=int, default=db.MINHASH_ROWS)
+    p.add_argument("--recall", action="store_true", help="also cluster every pair exactly (slow) and report LSH recall")
+    p.add_argument("--show", type=int, default=0, help="print N sample clusters per threshold")
+    p.set_defaults(func=bench_near_dup)
+
+    p = sub.add_parser("dedupe-keys", help="ASCII-stripped vs Unicode dedupe keys over data/raw")
+    add_days(p)
+    p.add_argument("--repeat", type=int, default=3)
+    p.add_argument("--show", type=int, default=5, help="print N examples of each kind of difference")
+    p.set_defaults(func=bench_dedupe_keys)
+
+    p = sub.add_parser("translate-routing", help="legacy vs script-profile translation routing over data/raw")
+    add_days(p)
+    p.add_argument("--per-day", action="store_true", help="print a row per archived day")
+    p.set_defaults(func=bench_translate_routing)
+
+    p = sub.add_parser("story-index", help="replay archived days through the cross-day story index")
+    add_days(p)
+    p.add_argument("--days", type=int, default=db.STORY_INDEX_DAYS, help="retention window")
+    p.set_defaults(func=bench_story_index)
+
+    p = sub.add_parser("url-dupes", help="duplicate rate by raw vs canonical URL across data/raw")
+    add_days(p)
+    p.add_argument("--repeat", type=int, default=1)
+    p.add_argument("--show", type=int, default=5, help="print N canonical URLs with several raw variants")
+    p.set_defaults(func=bench_url_dupes)
+
+    args = parser.parse_args(argv)
+    if args.offline:
+        import fake_llm
+        url = fake_llm.serve_in_thread(fake_llm.Config(args.offline, args.error_rate, retry_after=0.2))
+        db.client = db.make_client(url)
+        print(f"[bench] offline LLM at {url} ({args.offline}, errors {args.error_rate:.0%})")
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
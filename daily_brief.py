@@ -1,23 +1,98 @@
 # daily_brief.py — Financial News Brief (Overhauled v2)
 # Model: DeepSeek V4 Pro via OpenRouter, reasoning=medium
-import os, json, time, csv, re
+import os, json, time, csv, re, math, copy, hashlib, threading, random, unicodedata, gzip, zlib, bisect
+from collections import deque, Counter
+from concurrent.futures import ThreadPoolExecutor, wait, TimeoutError as FutureTimeout
+from contextlib import contextmanager
 from datetime import date, datetime, timezone, timedelta
+from email.utils import parsedate_to_datetime
 from typing import List, Dict, Any, Tuple, Optional
 import requests
-from openai import OpenAI
-from urllib.parse import urlparse, urlencode
+from openai import OpenAI, APIConnectionError, APIStatusError
+from urllib.parse import urlparse, urlencode, urlsplit, parse_qsl
+try:
+    import numpy as np  # in requirements.txt; without it the section classifier is skipped
+except ImportError:
+    np = None
 
 # ---------- CONFIG ----------
 TARGET_ARTICLES = int(os.getenv("MARKETAUX_TARGET", "99"))
 PER_CALL_LIMIT = 3
-REQUEST_DELAY_S = 0.6
+MARKETAUX_RPS = float(os.getenv("MARKETAUX_RPS", "2"))
+MARKETAUX_CONCURRENCY = max(1, int(os.getenv("MARKETAUX_CONCURRENCY", "4")))
+# Fetch-stage HTTP cache: "passthrough" (live), "record" (live + store), "replay" (store only, no network)
+FETCH_CACHE_MODE = os.getenv("FETCH_CACHE_MODE", "passthrough")
+FETCH_CACHE_DIR = os.getenv("FETCH_CACHE_DIR", ".cache/http")
+FETCH_CACHE_DAY = os.getenv("FETCH_CACHE_DAY") or date.today().isoformat()
 MODEL = "deepseek/deepseek-v4-pro"
 REASONING = {"extra_body": {"reasoning": {"effort": "medium"}}}
 SITE_BASE_URL = os.getenv("SITE_BASE_URL", "https://sanky0-0.github.io/financial-news-brief")
 TRANSLATE_TO_EN = os.getenv("TRANSLATE", "1") == "1"
 DRY_RUN = os.getenv("DRY_RUN", "0") == "1"
+INCREMENTAL = os.getenv("INCREMENTAL", "0") == "1"  # same-day rerun fetches only articles newer than the watermarks
+# Trained fallback for headlines the keyword rules leave in "Other" (see train_classifier.py)
+SECTION_CLF = os.getenv("SECTION_CLF", "0") == "1"
+SECTION_CLF_PATH = os.getenv("SECTION_CLF_PATH", "models/section_clf.npz")
+SECTION_CLF_MIN_PROB = float(os.getenv("SECTION_CLF_MIN_PROB", "0.7"))
+# Near-duplicate (same story, reworded) clustering in dedupe: MinHash over title
+# word shingles, LSH with BANDS x ROWS hashes, kept when Jaccard >= threshold
+NEAR_DUP_THRESHOLD = float(os.getenv("NEAR_DUP_THRESHOLD", "0.6"))  # 0 disables
+MINHASH_BANDS = int(os.getenv("MINHASH_BANDS", "16"))
+MINHASH_ROWS = int(os.getenv("MINHASH_ROWS", "4"))
+# Cross-day story index: stories briefed in the last N days are dropped (or,
+# with "demote", kept but listed after fresh ones) before any LLM work
+STORY_INDEX = os.getenv("STORY_INDEX", "1") == "1"
+STORY_INDEX_PATH = os.getenv("STORY_INDEX_PATH", ".cache/story_index.json.gz")
+STORY_INDEX_DAYS = int(os.getenv("STORY_INDEX_DAYS", "3"))
+STORY_REPEATS = os.getenv("STORY_REPEATS", "drop")  # "drop" | "demote"
+# Per-day stage checkpoints: a rerun resumes from the first stage whose inputs changed
+RESUME = os.getenv("RESUME", "1") == "1"
+WORK_DIR = os.getenv("WORK_DIR", ".cache/work")
+WORK_KEEP_DAYS = int(os.getenv("WORK_KEEP_DAYS", "7"))
 GDELT_QUERY = os.getenv("GDELT_QUERY", "finance OR market OR stocks OR earnings")
 GDELT_MAXREC = int(os.getenv("GDELT_MAXREC", "150"))
+GDELT_HOURS_BACK = float(os.getenv("GDELT_HOURS_BACK", "24"))
+GDELT_SLICES = max(1, int(os.getenv("GDELT_SLICES", "6")))  # lookback split into N windows
+GDELT_SLICE_MAXREC = int(os.getenv("GDELT_SLICE_MAXREC", "0"))  # 0 = GDELT_MAXREC spread evenly
+GDELT_RETRIES = int(os.getenv("GDELT_RETRIES", "2"))
+GDELT_RPS = float(os.getenv("GDELT_RPS", "0.2"))  # the DOC API allows one request every 5s
+# Per-provider wall-clock caps for the concurrent fetch stage. GDELT's default
+# leaves room for every slice to use all its attempts at GDELT_RPS, plus 30s.
+_GDELT_WORST_S = GDELT_SLICES * (GDELT_RETRIES + 1) / GDELT_RPS if GDELT_RPS > 0 else 0
+FETCH_TIMEOUTS_S = {"gdelt": float(os.getenv("GDELT_TIMEOUT_S") or max(90, _GDELT_WORST_S + 30)),
+                    "marketaux": float(os.getenv("MARKETAUX_TIMEOUT_S", "120"))}
+TRANSLATION_MEMO_PATH = os.getenv("TRANSLATION_MEMO_PATH", "data/translations.json")
+TRANSLATION_MEMO_MAX = int(os.getenv("TRANSLATION_MEMO_MAX", "20000"))
+TRANSLATE_CHUNK_TOKENS = int(os.getenv("TRANSLATE_CHUNK_TOKENS", "1000"))
+TRANSLATE_REASONING_TOKENS = int(os.getenv("TRANSLATE_REASONING_TOKENS", "1500"))
+TRANSLATE_RETRY_ROUNDS = int(os.getenv("TRANSLATE_RETRY_ROUNDS", "1"))
+TRANSLATE_SCRIPT_SHARE = float(os.getenv("TRANSLATE_SCRIPT_SHARE", "0.3"))  # non-Latin letter share that forces translation
+BRIEF_WHY_MODE = os.getenv("BRIEF_WHY_MODE", "fanout")  # "fanout" = one call per section, "single" = one JSON call
+LLM_CONCURRENCY = max(1, int(os.getenv("LLM_CONCURRENCY", "4")))
+LLM_CACHE = os.getenv("LLM_CACHE", "1") == "1"
+LLM_CACHE_DIR = os.getenv("LLM_CACHE_DIR", ".cache/llm")
+LLM_CACHE_MAX_MB = float(os.getenv("LLM_CACHE_MAX_MB", "200"))
+LLM_CACHE_MAX_AGE_DAYS = float(os.getenv("LLM_CACHE_MAX_AGE_DAYS", "30"))
+LLM_BASE_URL = os.getenv("LLM_BASE_URL", "https://openrouter.ai/api/v1")  # e.g. fake_llm.py for offline runs
+LLM_TIMEOUT_S = float(os.getenv("LLM_TIMEOUT_S", "180"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+LLM_BACKOFF_BASE_S = float(os.getenv("LLM_BACKOFF_BASE_S", "1.0"))
+LLM_BACKOFF_MAX_S = float(os.getenv("LLM_BACKOFF_MAX_S", "30"))
+LLM_RPS = float(os.getenv("LLM_RPS", "2"))
+LLM_BREAKER_THRESHOLD = int(os.getenv("LLM_BREAKER_THRESHOLD", "5"))
+LLM_BREAKER_COOLDOWN_S = float(os.getenv("LLM_BREAKER_COOLDOWN_S", "60"))
+# Run-level time budget for the LLM stage (0 = unlimited). As it runs down,
+# calls degrade: low reasoning effort -> fallback model -> skipped with a marker.
+LLM_BUDGET_S = float(os.getenv("LLM_BUDGET_S", "900"))
+LLM_BUDGET_LOW_EFFORT_AT = float(os.getenv("LLM_BUDGET_LOW_EFFORT_AT", "0.5"))  # fraction of budget left
+LLM_BUDGET_FALLBACK_AT = float(os.getenv("LLM_BUDGET_FALLBACK_AT", "0.25"))
+LLM_BUDGET_SKIP_AT = float(os.getenv("LLM_BUDGET_SKIP_AT", "0.05"))
+LLM_BUDGET_GRACE_S = float(os.getenv("LLM_BUDGET_GRACE_S", "10"))
+LLM_FALLBACK_MODEL = os.getenv("LLM_FALLBACK_MODEL", "deepseek/deepseek-chat")
+BUDGET_SKIP_MARKER = "_Analysis skipped: LLM time budget reached._"
+# USD per 1M tokens; only used when the provider doesn't report usage.cost
+LLM_PRICE_IN_PER_M = float(os.getenv("LLM_PRICE_IN_PER_M", "0.5"))
+LLM_PRICE_OUT_PER_M = float(os.getenv("LLM_PRICE_OUT_PER_M", "2.0"))
 
 # ---------- KEYS ----------
 OPENROUTER_API_KEY = os.environ.get("OPENROUTER_API_KEY")
@@ -30,22 +105,441 @@ if not MARKETAUX_API_KEY:
 if missing:
     print(f"[WARN] Missing: {', '.join(missing)}. Some features disabled.")
 
-client = OpenAI(
-    api_key=OPENROUTER_API_KEY or "dummy",
-    base_url="https://openrouter.ai/api/v1"
-)
+# One client is shared by every LLM worker thread. The OpenAI SDK client is
+# thread-safe (it wraps a pooled httpx.Client), so no per-thread copies needed.
+# SDK retries are off: call_llm owns retry/backoff so the limiter and breaker
+# see every attempt.
+def make_client(base_url=LLM_BASE_URL):
+    return OpenAI(
+        api_key=OPENROUTER_API_KEY or "dummy",
+        base_url=base_url,
+        timeout=LLM_TIMEOUT_S,
+        max_retries=0,
+    )
+
+client = make_client()
+
+# ---------- RATE LIMITING / CIRCUIT BREAKER ----------
+class TokenBucket:
+    """Thread-safe token bucket. acquire() blocks until a request may go out."""
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self.tokens = self.capacity
+        self.stamp = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, deadline=None):
+        """True once a token is taken; False if none frees up before `deadline`."""
+        if self.rate <= 0:
+            return True
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.stamp) * self.rate)
+                self.stamp = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait = (1 - self.tokens) / self.rate
+            if deadline is not None and now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+class SharedTokenBucket(TokenBucket):
+    """TokenBucket whose state lives in shared memory: pass it to a process
+    pool's initializer and every worker draws from the same rate limit."""
+    def __init__(self, rate, burst=None, ctx=None):
+        import multiprocessing
+        ctx = ctx or multiprocessing.get_context()
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self._state = ctx.RawArray("d", [self.capacity, time.monotonic()])  # tokens, stamp
+        self.lock = ctx.Lock()
+
+    tokens = property(lambda self: self._state[0], lambda self, v: self._state.__setitem__(0, v))
+    stamp = property(lambda self: self._state[1], lambda self, v: self._state.__setitem__(1, v))
+
+class CircuitBreaker:
+    """Opens after `threshold` consecutive failures; while open, calls fail
+    fast. After `cooldown` seconds one probe call is let through."""
+    def __init__(self, threshold, cooldown):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at >= self.cooldown:
+                self.opened_at = time.monotonic()  # half-open: one probe, others keep waiting
+                return True
+            return False
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.failures >= self.threshold:
+                if self.opened_at is None:
+                    print(f"[LLM] circuit open after {self.failures} consecutive failures")
+                self.opened_at = time.monotonic()
+
+class LlmBudget:
+    """Wall-clock budget for the LLM stage, shared by every worker.
+
+    level() maps the fraction of budget left to how a new call should run:
+    "full", "low_effort", "fallback" (cheaper model) or "skip".
+    """
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.deadline = None
+
+    def start(self):
+        if self.seconds > 0:
+            self.deadline = time.monotonic() + self.seconds
+
+    def remaining(self):
+        if self.deadline is None:
+            return float("inf")
+        return self.deadline - time.monotonic()
+
+    def level(self):
+        if self.deadline is None:
+            return "full"
+        left = self.remaining() / self.seconds
+        if left <= LLM_BUDGET_SKIP_AT:
+            return "skip"
+        if left <= LLM_BUDGET_FALLBACK_AT:
+            return "fallback"
+        if left <= LLM_BUDGET_LOW_EFFORT_AT:
+            return "low_effort"
+        return "full"
+
+    def wait_timeout(self):
+        """How long a scheduler may wait on outstanding calls (None = forever)."""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.remaining()) + LLM_BUDGET_GRACE_S
+
+_llm_limiter = TokenBucket(LLM_RPS)
+_llm_breaker = CircuitBreaker(LLM_BREAKER_THRESHOLD, LLM_BREAKER_COOLDOWN_S)
+llm_budget = LlmBudget(LLM_BUDGET_S)
+
+def _degrade(kwargs, level):
+    """Cheapen a request for the given budget level (mutates kwargs)."""
+    body = kwargs.get("extra_body")
+    if level == "low_effort" and body and "reasoning" in body:
+        kwargs["extra_body"] = {**body, "reasoning": {"effort": "low"}}
+    elif level == "fallback":
+        kwargs["model"] = LLM_FALLBACK_MODEL
+        if body and "reasoning" in body:
+            kwargs["extra_body"] = {k: v for k, v in body.items() if k != "reasoning"}
+    return kwargs
+
+def _is_retryable(exc):
+    if isinstance(exc, APIConnectionError):  # includes timeouts
+        return True
+    if isinstance(exc, APIStatusError):
+        return exc.status_code in (408, 409, 429) or exc.status_code >= 500
+    return False
+
+def _retry_after_s(exc):
+    """Seconds the provider asked us to wait (Retry-After), or None."""
+    response = getattr(exc, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+def _backoff_s(attempt, retry_after=None):
+    """Full-jitter exponential backoff, never shorter than Retry-After."""
+    delay = random.uniform(0, min(LLM_BACKOFF_MAX_S, LLM_BACKOFF_BASE_S * 2 ** attempt))
+    if retry_after is not None:
+        delay = max(delay, retry_after + random.uniform(0, LLM_BACKOFF_BASE_S))
+    return min(delay, LLM_BACKOFF_MAX_S)
+
+# ---------- LLM RESPONSE CACHE ----------
+# Content-addressed: one JSON file per request hash under LLM_CACHE_DIR.
+# Reruns and DRY_RUN iterations on the same inputs never hit the API twice.
+# The endpoint is part of the key, so replies from fake_llm.py or another
+# LLM_BASE_URL never answer for the production API.
+def _llm_cache_key(kwargs, base_url):
+    blob = json.dumps({"endpoint": str(base_url), **kwargs}, sort_keys=True, ensure_ascii=False,
+                      separators=(",", ":"))
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+def _llm_cache_path(key):
+    return os.path.join(LLM_CACHE_DIR, key[:2], f"{key}.json")
+
+def llm_cache_get(key):
+    path = _llm_cache_path(key)
+    try:
+        with open(path, encoding="utf-8") as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if time.time() - entry.get("created", 0) > LLM_CACHE_MAX_AGE_DAYS * 86400:
+        return None
+    try:
+        os.utime(path)  # mtime = last use, for size-based eviction
+    except OSError:
+        pass
+    return entry.get("content")
+
+def llm_cache_put(key, content):
+    path = _llm_cache_path(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"created": time.time(), "content": content}, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+def prune_llm_cache():
+    """Drop entries older than LLM_CACHE_MAX_AGE_DAYS, then least recently
+    used ones until the cache fits in LLM_CACHE_MAX_MB."""
+    if not os.path.isdir(LLM_CACHE_DIR):
+        return
+    cutoff = time.time() - LLM_CACHE_MAX_AGE_DAYS * 86400
+    entries = []
+    for root, _, files in os.walk(LLM_CACHE_DIR):
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            # mtime >= created, so anything last used before the cutoff is stale
+            if st.st_mtime < cutoff or name.endswith(".tmp"):
+                os.remove(path)
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    budget = LLM_CACHE_MAX_MB * 1024 * 1024
+    removed = 0
+    for _, size, path in sorted(entries):
+        if total <= budget:
+            break
+        os.remove(path)
+        total -= size
+        removed += 1
+    if removed:
+        print(f"[LLM] cache: evicted {removed} entries")
 
 # ---------- LLM WRAPPER ----------
-def call_llm(messages, max_tokens=300, temperature=0.2, model=MODEL, extra_params=None):
+def _llm_request(kwargs, timing):
+    """Send one chat completion: rate-limited, retried on 429/5xx/network
+    errors with backoff, and short-circuited while the breaker is open.
+
+    Returns (content, usage, attempts, status). Seconds spent waiting on the
+    limiter, in the API call itself and in retry backoff are added to
+    timing["queue_s"], ["api_s"] and ["backoff_s"].
+    """
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        if not _llm_breaker.allow():
+            print("[LLM] circuit open, skipping call")
+            return "", None, attempt, "breaker_open"
+        queued = time.monotonic()
+        _llm_limiter.acquire()
+        timing["queue_s"] += time.monotonic() - queued
+        # Bound each attempt by the budget deadline (plus grace), so a call
+        # run_llm_jobs has given up on can't keep its worker thread alive.
+        left = llm_budget.wait_timeout()
+        if left is not None:
+            if left < 1.0:
+                print("[LLM] no time budget left for another attempt")
+                return "", None, attempt, "error"
+            kwargs["timeout"] = min(LLM_TIMEOUT_S, left)
+        sent = time.monotonic()
+        try:
+            resp = client.chat.completions.create(**kwargs)
+        except Exception as e:
+            timing["api_s"] += time.monotonic() - sent
+            if not _is_retryable(e):
+                print(f"[LLM] error: {e}")
+                return "", None, attempt + 1, "error"
+            _llm_breaker.record_failure()
+            if attempt == LLM_MAX_RETRIES:
+                print(f"[LLM] error after {attempt + 1} attempts: {e}")
+                return "", None, attempt + 1, "error"
+            delay = _backoff_s(attempt, _retry_after_s(e))
+            if delay >= llm_budget.remaining():
+                print(f"[LLM] error, no time budget left to retry: {e}")
+                return "", None, attempt + 1, "error"
+            print(f"[LLM] {type(e).__name__}, retry {attempt + 1}/{LLM_MAX_RETRIES} in {delay:.1f}s")
+            time.sleep(delay)
+            timing["backoff_s"] += delay
+            continue
+        timing["api_s"] += time.monotonic() - sent
+        _llm_breaker.record_success()
+        content = (resp.choices[0].message.content or "").strip()
+        return content, getattr(resp, "usage", None), attempt + 1, "ok"
+    return "", None, LLM_MAX_RETRIES + 1, "error"
+
+def call_llm(messages, max_tokens=300, temperature=0.2, model=MODEL, extra_params=None, purpose="other",
+             on_skip=""):
+    """Chat completion -> stripped text ("" on failure, `on_skip` if the
+    time budget ran out before the call could be made)."""
+    started = time.monotonic()
+    level = llm_budget.level()
+    record = {"purpose": purpose, "model": model, "status": "error", "attempts": 0, "level": level}
     try:
         kwargs = dict(model=model, messages=messages, max_tokens=max_tokens, temperature=temperature)
         if extra_params:
             kwargs.update(extra_params)
-        resp = client.chat.completions.create(**kwargs)
-        return (resp.choices[0].message.content or "").strip()
+        # A cached reply costs nothing, so look before degrading or skipping:
+        # the full-quality reply first, then the one this level would ask for.
+        key = None
+        for lvl in dict.fromkeys(("full", level)) if LLM_CACHE else ():
+            if lvl == "skip":
+                break
+            key = _llm_cache_key(_degrade(dict(kwargs), lvl), client.base_url)
+            cached = llm_cache_get(key)
+            if cached is not None:
+                record["status"], record["level"] = "cached", lvl
+                return cached
+        if level == "skip":
+            record["status"] = "skipped"
+            return on_skip
+        _degrade(kwargs, level)
+        record["model"] = kwargs["model"]
+        timing = {"queue_s": 0.0, "api_s": 0.0, "backoff_s": 0.0}
+        content, usage, record["attempts"], record["status"] = _llm_request(kwargs, timing)
+        record.update({k: round(v, 3) for k, v in timing.items()})
+        record.update(_usage_fields(usage))
+        if key and content:
+            llm_cache_put(key, content)
+        return content
     except Exception as e:
         print(f"[LLM] error: {e}")
         return ""
+    finally:
+        record["wall_s"] = round(time.monotonic() - started, 3)
+        with _llm_calls_lock:
+            _llm_calls.append(record)
+
+# ---------- RUN INSTRUMENTATION ----------
+# Every call_llm appends one record; main() turns them into out/<date>.run.json.
+_llm_calls = []
+_llm_calls_lock = threading.Lock()
+_llm_abandoned = 0  # jobs run_llm_jobs gave up on; their records land after the caller moves on
+_run_stats = {"stages": {}}
+
+def llm_calls_mark():
+    with _llm_calls_lock:
+        return len(_llm_calls), _llm_abandoned
+
+def llm_calls_clean(mark):
+    """True when every LLM call since `mark` (from llm_calls_mark) got a
+    full-quality reply: no errors, open breaker, budget skips, degraded
+    levels or abandoned jobs. Stages only checkpoint clean output."""
+    start, abandoned = mark
+    with _llm_calls_lock:
+        if _llm_abandoned != abandoned:
+            return False
+        calls = _llm_calls[start:]
+    return all(r["status"] in ("ok", "cached") and r.get("level", "full") == "full" for r in calls)
+
+def _usage_fields(usage):
+    if usage is None:
+        return {}
+    prompt = getattr(usage, "prompt_tokens", 0) or 0
+    completion = getattr(usage, "completion_tokens", 0) or 0
+    details = getattr(usage, "completion_tokens_details", None)
+    reasoning = (getattr(details, "reasoning_tokens", 0) or 0) if details else 0
+    cost = getattr(usage, "cost", None)  # OpenRouter reports actual spend
+    if cost is None:
+        cost = (prompt * LLM_PRICE_IN_PER_M + completion * LLM_PRICE_OUT_PER_M) / 1e6
+    return {"prompt_tokens": prompt, "completion_tokens": completion,
+            "reasoning_tokens": reasoning, "cost_usd": round(float(cost), 6)}
+
+@contextmanager
+def stage_timer(name):
+    started = time.monotonic()
+    try:
+        yield
+    finally:
+        _run_stats["stages"][name] = round(time.monotonic() - started, 3)
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+def summarize_llm_calls(calls):
+    """Aggregate call records per purpose plus a run-wide total."""
+    groups = {}
+    for rec in calls:
+        groups.setdefault(rec["purpose"], []).append(rec)
+    groups["total"] = list(calls)
+    summary = {}
+    for purpose, recs in groups.items():
+        # latency only over calls that reached the API, and only the time spent in it:
+        # limiter queueing and retry backoff are reported on their own
+        live = [r for r in recs if r["status"] not in ("cached", "skipped") and r.get("attempts")]
+        api = [r.get("api_s", 0.0) for r in live]
+        rejected = sum(r["status"] == "breaker_open" and not r.get("attempts") for r in recs)
+        summary[purpose] = {
+            "calls": len(recs),
+            "cached": sum(r["status"] == "cached" for r in recs),
+            "errors": sum(r["status"] in ("error", "breaker_open") for r in recs) - rejected,
+            "skipped": sum(r["status"] == "skipped" for r in recs),
+            "rejected": rejected,
+            "degraded": sum(r.get("level", "full") in ("low_effort", "fallback") for r in recs),
+            "wall_s": round(sum(r["wall_s"] for r in live), 3),
+            "api_s": round(sum(api), 3),
+            "queue_s": round(sum(r.get("queue_s", 0.0) for r in live), 3),
+            "backoff_s": round(sum(r.get("backoff_s", 0.0) for r in live), 3),
+            "p50_s": _percentile(api, 50),
+            "p95_s": _percentile(api, 95),
+            "prompt_tokens": sum(r.get("prompt_tokens", 0) for r in recs),
+            "completion_tokens": sum(r.get("completion_tokens", 0) for r in recs),
+            "reasoning_tokens": sum(r.get("reasoning_tokens", 0) for r in recs),
+            "cost_usd": round(sum(r.get("cost_usd", 0.0) for r in recs), 6),
+        }
+    return summary
+
+def build_run_report(today):
+    with _llm_calls_lock:
+        calls = list(_llm_calls)
+    return {"date": today, "model": MODEL,
+            "finished_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            **_run_stats, "llm": summarize_llm_calls(calls), "calls": calls}
+
+def save_run_report(report, today):
+    os.makedirs("out", exist_ok=True)
+    with open(f"out/{today}.run.json", "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+def print_run_summary(report):
+    tot = report["llm"]["total"]
+    print(f"[LLM] {tot['calls']} calls ({tot['cached']} cached, {tot['errors']} failed, "
+          f"{tot['degraded']} degraded, {tot['skipped']} skipped, {tot['rejected']} rejected by breaker), "
+          f"API p50 {tot['p50_s']:.2f}s p95 {tot['p95_s']:.2f}s (+{tot['queue_s']:.1f}s queued, "
+          f"{tot['backoff_s']:.1f}s backoff), "
+          f"{tot['prompt_tokens']}+{tot['completion_tokens']} tokens, ${tot['cost_usd']:.4f}")
+    stages = ", ".join(f"{k} {v:.1f}s" for k, v in report.get("stages", {}).items())
+    if stages:
+        print(f"[Timing] {stages}")
 
 # ---------- STATE FILE ----------
 STATE_PATH = "run_state.json"
@@ -54,46 +548,209 @@ def load_state():
         with open(STATE_PATH) as f:
             return json.load(f)
     return {"last_run_date": None}
-def save_state(today):
+def save_state(today, watermarks=None):
+    state = {"last_run_date": today}
+    if watermarks:
+        state["watermarks"] = watermarks
     with open(STATE_PATH, "w") as f:
-        json.dump({"last_run_date": today}, f)
+        json.dump(state, f)
+
+# Per-provider watermarks: {"gdelt": {"date", "latest", "seen": [...]}, ...}.
+# "latest" is the newest published_at/seendate fetched today; "seen" holds the
+# uuids/urls already in today's raw set. Both reset when the date changes.
+WATERMARK_SEEN_MAX = 5000
+
+def _parse_published(value):
+    try:
+        dt = datetime.fromisoformat((value or "").replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+def _article_id(it):
+    return it.get("uuid") or canonical_url(it.get("url")) or it.get("title", "")
+
+def drop_seen(items, watermarks):
+    """Items whose uuid/url isn't already recorded in their provider's watermark."""
+    seen = {p: set(wm.get("seen", [])) for p, wm in watermarks.items()}
+    return [it for it in items if _article_id(it) not in seen.get(it.get("provider"), ())]
+
+def update_watermarks(watermarks, items, today):
+    for it in items:
+        provider = it.get("provider")
+        if not provider:
+            continue
+        wm = watermarks.setdefault(provider, {"date": today, "latest": None, "seen": []})
+        published = _parse_published(it.get("published_at"))
+        if published and (not wm["latest"] or published > _parse_published(wm["latest"])):
+            wm["latest"] = published.isoformat()
+        wm["seen"].append(_article_id(it))
+    for wm in watermarks.values():
+        wm["seen"] = list(dict.fromkeys(wm["seen"]))[-WATERMARK_SEEN_MAX:]
+    return watermarks
 
 # ---------- FETCH HELPERS ----------
-def fetch_marketaux_articles(api_key, per_call_limit, target, extra_params):
+# One pooled keep-alive session for every provider; fetch workers share it.
+def _make_http_session(pool_size=16):
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+http_session = _make_http_session()
+
+# ---------- FETCH RECORD/REPLAY ----------
+# Responses are stored gzipped per day under FETCH_CACHE_DIR/<day>/, keyed by
+# URL + sorted params minus api_token. Replaying a recorded day reproduces the
+# fetch stage with zero network; misses behave like a failed request.
+class ReplayMiss(Exception):
+    pass
+
+class FetchDeadline(TimeoutError):
+    """The provider's time cap ran out before this request could be sent."""
+
+_fetch_clock_lock = threading.Lock()
+_fetch_as_of = None
+
+def _fetch_cache_dir():
+    return os.path.join(FETCH_CACHE_DIR, FETCH_CACHE_DAY)
+
+def fetch_clock():
+    """'Now' for the fetch stage. Pinned per run (FETCH_AS_OF, or the recorded
+    run's clock when replaying) so GDELT windows and cache keys line up."""
+    global _fetch_as_of
+    with _fetch_clock_lock:
+        if _fetch_as_of is not None:
+            return _fetch_as_of
+        meta_path = os.path.join(_fetch_cache_dir(), "_meta.json")
+        if os.getenv("FETCH_AS_OF"):
+            _fetch_as_of = datetime.fromisoformat(os.environ["FETCH_AS_OF"])
+        elif FETCH_CACHE_MODE == "replay" and os.path.exists(meta_path):
+            with open(meta_path, encoding="utf-8") as f:
+                _fetch_as_of = datetime.fromisoformat(json.load(f)["as_of"])
+        else:
+            _fetch_as_of = datetime.now(timezone.utc).replace(microsecond=0)
+        if _fetch_as_of.tzinfo is None:
+            _fetch_as_of = _fetch_as_of.replace(tzinfo=timezone.utc)
+        if FETCH_CACHE_MODE == "record":
+            os.makedirs(_fetch_cache_dir(), exist_ok=True)
+            with open(meta_path, "w", encoding="utf-8") as f:
+                json.dump({"as_of": _fetch_as_of.isoformat()}, f)
+        return _fetch_as_of
+
+def _http_cache_key(url, params):
+    norm = sorted((k, str(v)) for k, v in (params or {}).items() if k != "api_token")
+    blob = json.dumps([url, norm], ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+def _replayed_response(entry):
+    r = requests.Response()
+    r.status_code = entry["status"]
+    r._content = entry["body"].encode("utf-8")
+    r.headers = requests.structures.CaseInsensitiveDict({"content-type": entry["content_type"]})
+    r.url = entry["url"]
+    r.encoding = "utf-8"
+    return r
+
+def http_get(url, params=None, headers=None, timeout=30, limiter=None, deadline=None):
+    """GET through the fetch cache; `limiter` only paces live requests. With a
+    `deadline` (time.monotonic()), the request's timeout never runs past it."""
+    path = os.path.join(_fetch_cache_dir(), _http_cache_key(url, params) + ".json.gz")
+    if FETCH_CACHE_MODE == "replay":
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                return _replayed_response(json.load(f))
+        except FileNotFoundError:
+            raise ReplayMiss(f"no recorded response for {url} ({os.path.basename(path)})")
+    if limiter and not limiter.acquire(deadline):
+        raise FetchDeadline(f"time cap reached before {url}")
+    if deadline is not None:
+        left = deadline - time.monotonic()
+        if left <= 0:
+            raise FetchDeadline(f"time cap reached before {url}")
+        timeout = min(timeout, left)
+    r = http_session.get(url, params=params, headers=headers, timeout=timeout)
+    if FETCH_CACHE_MODE == "record" and r.status_code == 200:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        entry = {"url": url, "params": {k: v for k, v in (params or {}).items() if k != "api_token"},
+                 "status": r.status_code, "content_type": r.headers.get("content-type", ""),
+                 "body": r.text}
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp, path)
+    return r
+_marketaux_limiter = TokenBucket(MARKETAUX_RPS)
+
+def _fetch_marketaux_page(api_key, per_call_limit, page, extra_params, deadline=None):
+    """(articles, meta) for one results page."""
     base = "https://api.marketaux.com/v1/news/all"
-    page = 1
+    params = {"api_token": api_key, "limit": str(per_call_limit), "page": str(page)}
+    params.update(extra_params)
+    r = http_get(base, params=params, timeout=30, limiter=_marketaux_limiter, deadline=deadline)
+    r.raise_for_status()
+    body = r.json()
+    return body.get("data") or [], body.get("meta") or {}
+
+def _marketaux_later_page(api_key, per_call_limit, page, extra_params, deadline=None):
+    """Articles on a page past the first; in replay, an unrecorded page is where the recording ended."""
+    try:
+        return _fetch_marketaux_page(api_key, per_call_limit, page, extra_params, deadline)[0]
+    except ReplayMiss:
+        return []
+
+def fetch_marketaux_articles(api_key, per_call_limit, target, extra_params, deadline=None):
+    """Crawl pages concurrently in waves of MARKETAUX_CONCURRENCY, paced by
+    MARKETAUX_RPS. Page 1 is fetched alone: its meta.found caps how many pages
+    the waves ask for, so free-tier quota isn't spent past the last page.
+    Pages are merged in page order; a short, empty or all-duplicate page ends
+    the crawl."""
+    items, meta = _fetch_marketaux_page(api_key, per_call_limit, 1, extra_params, deadline)
+    page_size = int(meta.get("limit") or per_call_limit)
+    last_page = -(-int(meta["found"]) // page_size) if meta.get("found") is not None else None
+    pages, page = [items], 2
     results = []
     seen = set()
-    while len(results) < target:
-        params = {"api_token": api_key, "limit": str(per_call_limit), "page": str(page)}
-        params.update(extra_params)
-        r = requests.get(base, params=params, timeout=30)
-        r.raise_for_status()
-        payload = r.json()
-        items = payload.get("data") or []
-        if not items:
-            break
-        added = 0
-        for it in items:
-            uid = it.get("uuid") or it.get("url") or it.get("title", "")
-            if not uid or uid in seen:
-                continue
-            seen.add(uid)
-            results.append(it)
-            added += 1
-            if len(results) >= target:
+    with ThreadPoolExecutor(max_workers=MARKETAUX_CONCURRENCY) as pool:
+        while True:
+            exhausted = False
+            for items in pages:
+                if len(results) >= target:
+                    break
+                added = 0
+                for it in items:
+                    uid = it.get("uuid") or it.get("url") or it.get("title", "")
+                    if not uid or uid in seen:
+                        continue
+                    seen.add(uid)
+                    results.append(it)
+                    added += 1
+                    if len(results) >= target:
+                        break
+                if added == 0 or len(items) < page_size:
+                    exhausted = True
+                    break
+            if exhausted or len(results) >= target:
                 break
-        if added == 0:
-            break
-        page += 1
-        time.sleep(REQUEST_DELAY_S)
+            # Don't request more pages than the remaining target needs, or than exist
+            wave = min(MARKETAUX_CONCURRENCY, -(-(target - len(results)) // page_size))
+            if last_page is not None:
+                wave = min(wave, last_page - page + 1)
+            if wave <= 0:
+                break
+            pages = list(pool.map(lambda p: _marketaux_later_page(api_key, per_call_limit, p, extra_params, deadline),
+                                  range(page, page + wave)))
+            page += wave
     return results[:target]
 
-def safe_fetch_marketaux(api_key, per_call_limit, target, params):
+def safe_fetch_marketaux(api_key, per_call_limit, target, params, since=None, deadline=None):
     if os.getenv("ENABLE_MARKETAUX", "0") != "1":
         return []
+    if since:
+        params = {**params, "published_after": since.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")}
     try:
-        return fetch_marketaux_articles(api_key, per_call_limit, target, params)
+        return fetch_marketaux_articles(api_key, per_call_limit, target, params, deadline)
     except Exception as e:
         print(f"[Marketaux] error: {e}")
         return []
@@ -110,64 +767,144 @@ def _normalize_gdelt_query(q):
         q = f"({q})"
     return q
 
-def fetch_gdelt(query="finance OR market OR stocks OR earnings",
-                max_records=150, hours_back=24):
-    """Fetch GDELT articles. Retries once on 429 rate limit."""
+_gdelt_limiter = TokenBucket(GDELT_RPS)
+
+def _parse_gdelt_articles(data):
+    out = []
+    for a in data.get("articles", []) or []:
+        title = (a.get("title") or "").strip()
+        url_ = a.get("url") or ""
+        domain = (a.get("domain") or "").strip()
+        lang = (a.get("language") or "").strip()
+        seen = (a.get("seendate") or "").strip()
+        published_iso = ""
+        if len(seen) == 14 and seen.isdigit():
+            try:
+                dt = datetime.strptime(seen, "%Y%m%d%H%M%S").replace(tzinfo=timezone.utc)
+                published_iso = dt.isoformat()
+            except Exception:
+                pass
+        out.append({"title": title, "title_en": None, "source": domain or "GDELT",
+                     "url": url_, "published_at": published_iso, "language": lang or None,
+                     "source_lang": lang or None, "provider": "gdelt"})
+    return out
+
+def _fetch_gdelt_window(q, max_records, start_dt, end_dt, deadline=None):
+    """One ArtList query over [start_dt, end_dt], retried with backoff on 429/errors."""
     base = "https://api.gdeltproject.org/api/v2/doc/doc"
     headers = {"User-Agent": "financial-news-ai/2.0"}
     debug = os.getenv("GDELT_DEBUG", "0") == "1"
-    q = _normalize_gdelt_query(query)
-    end_dt = datetime.now(timezone.utc)
-    start_dt = end_dt - timedelta(hours=hours_back)
     params = {
         "query": q, "mode": "ArtList", "maxrecords": str(max_records),
         "sort": "DateDesc", "format": "json",
         "startdatetime": _gdelt_stamp(start_dt), "enddatetime": _gdelt_stamp(end_dt),
     }
-
-    for attempt in range(2):
+    label = f"{params['startdatetime']}-{params['enddatetime']}"
+    for attempt in range(GDELT_RETRIES + 1):
         try:
-            r = requests.get(base, params=params, headers=headers, timeout=30)
+            r = http_get(base, params=params, headers=headers, timeout=30, limiter=_gdelt_limiter,
+                         deadline=deadline)
             if r.status_code == 429:
-                if attempt == 0:
-                    if debug: print("[GDELT] 429, retrying in 3s...")
-                    time.sleep(3)
-                    continue
-                return []
+                raise requests.HTTPError("429 rate limited", response=r)
             r.raise_for_status()
             if "application/json" not in r.headers.get("content-type", "").lower():
-                return []
-            data = r.json()
-            arts = data.get("articles", []) or []
-            out = []
-            for a in arts:
-                title = (a.get("title") or "").strip()
-                url_ = a.get("url") or ""
-                domain = (a.get("domain") or "").strip()
-                lang = (a.get("language") or "").strip()
-                seen = (a.get("seendate") or "").strip()
-                published_iso = ""
-                if len(seen) == 14 and seen.isdigit():
-                    try:
-                        dt = datetime.strptime(seen, "%Y%m%d%H%M%S").replace(tzinfo=timezone.utc)
-                        published_iso = dt.isoformat()
-                    except Exception:
-                        pass
-                out.append({"title": title, "title_en": None, "source": domain or "GDELT",
-                             "url": url_, "published_at": published_iso, "language": lang or None,
-                             "source_lang": lang or None, "provider": "gdelt"})
+                return []  # GDELT answers bad queries with a text/html message
+            out = _parse_gdelt_articles(r.json())
             if debug:
-                print(f"[GDELT] returning {len(out)} articles")
+                print(f"[GDELT] {label}: {len(out)} articles")
             return out
+        except (ReplayMiss, FetchDeadline) as e:
+            print(f"[GDELT] {label}: {e}")
+            return []
         except Exception as e:
-            if attempt == 0:
-                if debug: print(f"[GDELT] {e}, retrying...")
-                time.sleep(3)
+            # never sooner than GDELT's own pacing, and no sooner than it asks
+            delay = max(3 * 2 ** attempt, 1 / GDELT_RPS if GDELT_RPS > 0 else 0,
+                        _retry_after_s(e) or 0) + random.uniform(0, 1)
+            if attempt < GDELT_RETRIES and (deadline is None or time.monotonic() + delay < deadline):
+                if debug: print(f"[GDELT] {label}: {e}, retrying in {delay:.0f}s...")
+                time.sleep(delay)
                 continue
-            print(f"[GDELT] error: {e}")
+            print(f"[GDELT] {label} error: {e}")
             return []
     return []
 
+def fetch_gdelt(query="finance OR market OR stocks OR earnings",
+                max_records=150, hours_back=24, slices=GDELT_SLICES, since=None, deadline=None):
+    """Fetch GDELT articles over the last `hours_back` hours (or since the
+    `since` watermark, if that is more recent).
+
+    The window is split into `slices` sub-windows fetched concurrently, so
+    maxrecords no longer lets the newest hour crowd out the rest of the day.
+    Each slice retries on its own; results merge newest-first, deduped by URL.
+    """
+    q = _normalize_gdelt_query(query)
+    end_dt = fetch_clock()
+    start_dt = end_dt - timedelta(hours=hours_back)
+    if since and since > start_dt:
+        start_dt = min(since, end_dt - timedelta(minutes=15))
+    step = (end_dt - start_dt) / slices
+    windows = [(end_dt - step * (i + 1), end_dt - step * i) for i in range(slices)]
+    per_slice = GDELT_SLICE_MAXREC or -(-max_records // slices)
+    with ThreadPoolExecutor(max_workers=slices) as pool:
+        parts = list(pool.map(lambda w: _fetch_gdelt_window(q, per_slice, *w, deadline=deadline), windows))
+    out, seen_urls = [], set()
+    for part in parts:
+        for it in part:
+            if it["url"] and it["url"] in seen_urls:
+                continue
+            seen_urls.add(it["url"])
+            out.append(it)
+    if os.getenv("GDELT_DEBUG", "0") == "1":
+        print(f"[GDELT] returning {len(out)} articles from {slices} slices")
+    return out
+
+def fetch_all_sources(dry_run=False, watermarks=None):
+    """Run every enabled provider at once; merge in fixed provider order.
+
+    Fetch latency is the slowest provider, not the sum. A provider that
+    errors or overruns its FETCH_TIMEOUTS_S cap contributes nothing. With
+    watermarks, each provider only asks for articles newer than its own.
+    """
+    watermarks = watermarks or {}
+    since = {p: _parse_published(wm.get("latest")) for p, wm in watermarks.items()}
+    started = time.monotonic()
+    # Each provider's requests are timed out at its cap, so none outlives the wait below
+    deadline = {p: started + FETCH_TIMEOUTS_S.get(p, 120) for p in ("gdelt", "marketaux")}
+    providers = {}
+    if os.getenv("ENABLE_GDELT", "1") == "1":
+        providers["gdelt"] = lambda: fetch_gdelt(query=GDELT_QUERY, max_records=GDELT_MAXREC if not dry_run else 20,
+                                                 hours_back=GDELT_HOURS_BACK, slices=GDELT_SLICES if not dry_run else 1,
+                                                 since=since.get("gdelt"), deadline=deadline["gdelt"])
+    if os.getenv("ENABLE_MARKETAUX", "0") == "1":
+        providers["marketaux"] = lambda: safe_fetch_marketaux(MARKETAUX_API_KEY, PER_CALL_LIMIT,
+                                                              TARGET_ARTICLES if not dry_run else 5,
+                                                              {"filter_entities": "true"},
+                                                              since=since.get("marketaux"),
+                                                              deadline=deadline["marketaux"])
+    if not providers:
+        return []
+    mode = "" if FETCH_CACHE_MODE == "passthrough" else f", {FETCH_CACHE_MODE} {_fetch_cache_dir()}"
+    print(f"[Fetch] {', '.join(providers)} (concurrent{mode})...")
+    pool = ThreadPoolExecutor(max_workers=len(providers))
+    futures = {name: pool.submit(fn) for name, fn in providers.items()}
+    merged = []
+    for name, fut in futures.items():
+        timeout = max(0.0, deadline[name] - time.monotonic())
+        try:
+            items = fut.result(timeout=timeout)
+        except FutureTimeout:
+            print(f"[Fetch] {name}: timed out after {FETCH_TIMEOUTS_S.get(name, 120):.0f}s")
+            items = []
+        except Exception as e:
+            print(f"[Fetch] {name} error: {e}")
+            items = []
+        print(f"  {name}: {len(items)} articles")
+        for it in items:
+            it.setdefault("provider", name)
+        merged.extend(items)
+    pool.shutdown(wait=False, cancel_futures=True)
+    return merged
+
 # ---------- SECTION ARCHITECTURE (10 sections) ----------
 
 # Noise filter — drop sports, weather, entertainment, historical
@@ -218,96 +955,772 @@ TAG_KEYWORDS = {
     ],
 }
 
+# Precompiled classifier. Each rule is wrapped as a lookahead alternative
+# (?=(?P<rN>...)), so at every position the regex engine reports the
+# highest-priority rule matching there; the lowest N over one finditer pass is
+# exactly the first rule that re.search would hit anywhere in the title.
+# Every rule starts with \b, which is hoisted out so non-boundary positions are
+# rejected by one check instead of one per rule.
+def _compile_rules(rules):
+    if not all(pat.startswith(r"\b") for _, pat in rules):
+        raise ValueError("classifier rules must start with \\b")
+    alts = "|".join(f"(?=(?P<r{i}>{pat[2:]}))" for i, (_, pat) in enumerate(rules))
+    return re.compile(rf"\b(?:{alts})")
+
+_NOISE_RULES = [("noise", pat) for pat in NOISE_PATTERNS]
+_SECTION_RULES = [(section, pat) for section, patterns in TAG_KEYWORDS.items() for pat in patterns]
+_CLASSIFY_RULES = _NOISE_RULES + _SECTION_RULES
+_NOISE_RE = _compile_rules(_NOISE_RULES)
+_SECTION_RE = _compile_rules(_SECTION_RULES)
+_CLASSIFY_RE = _compile_rules(_CLASSIFY_RULES)
+
+def _first_rule(regex, rules, text):
+    best = len(rules)
+    for m in regex.finditer(text):
+        idx = int(m.lastgroup[1:])
+        if idx < best:
+            best = idx
+            if idx == 0:
+                break
+    return rules[best][0] if best < len(rules) else None
+
+def classify_title(title):
+    """Return "noise" or the section for a title, in a single scan."""
+    return _first_rule(_CLASSIFY_RE, _CLASSIFY_RULES, title.lower()) or "Other"
+
 def is_noise(title):
     """Return True if title is sports/weather/entertainment and should be dropped."""
-    t = title.lower()
-    for pat in NOISE_PATTERNS:
-        if re.search(pat, t):
-            return True
-    return False
+    return _NOISE_RE.search(title.lower()) is not None
 
 def choose_section(title):
-    t = title.lower()
-    for section, patterns in TAG_KEYWORDS.items():
-        for pat in patterns:
-            if re.search(pat, t):
-                return section
-    return "Other"
+    return _first_rule(_SECTION_RE, _SECTION_RULES, title.lower()) or "Other"
 
-def tag_headlines(items):
-    tagged = []
+# Derived per-run fields; recomputed from title/title_en, never persisted to data/raw.
+DERIVED_FIELDS = ("display_title", "section", "section_by", "is_noise", "cluster_size", "seen_on")
+
+def display_title(it):
+    if "display_title" in it:
+        return it["display_title"]
+    return (it.get("title_en") or it.get("title") or "").strip()
+
+def annotate_items(items):
+    """Tag every item once: display_title, section (None if untitled),
+    section_by ("rules" or "model") and is_noise. Call after translation;
+    every later stage reads these fields."""
     for it in items:
         title = (it.get("title_en") or it.get("title") or "").strip()
-        if not title:
-            continue
-        if is_noise(title):
-            continue
-        tagged.append((it, choose_section(title)))
-    return tagged
+        label = classify_title(title) if title else None
+        it["display_title"] = title
+        it["is_noise"] = label == "noise"
+        it["section"] = None if label in (None, "noise") else label
+        it["section_by"] = "rules"
+    others = [it for it in items if it["section"] == "Other"]
+    clf = section_classifier() if others else None
+    if clf:
+        moved = 0
+        for it, (label, prob) in zip(others, clf.predict([it["display_title"] for it in others])):
+            if label != "Other" and prob >= SECTION_CLF_MIN_PROB:
+                it["section"] = label
+                it["section_by"] = "model"
+                moved += 1
+        print(f"[Tag] classifier moved {moved}/{len(others)} 'Other' headlines")
+    return items
 
-def dedupe_items(items):
-    seen = set()
+def tag_headlines(items):
+    """[(item, section)] for titled, non-noise items (annotating any that aren't yet)."""
+    annotate_items([it for it in items if "section" not in it])
+    return [(it, it["section"]) for it in items if it["section"]]
+
+# ---------- BATCH KEYWORD AUTOMATON ----------
+# Most rules are \b(word|two words|...)\b alternations of plain literals.
+# Those literals are compiled into one Aho-Corasick automaton over word
+# tokens (tokens = maximal \w+ runs, i.e. exactly what \b delimits), so a
+# batch scan is linear in the tokens and reports EVERY label hit per title.
+# Alternatives with regex syntax (profit.*(beat|miss), [0-9]+nm, ...) stay
+# regexes, OR-ed into one residual pattern per label.
+_WORD_RE = re.compile(r"\w+")
+_LITERAL_RE = re.compile(r"[a-z0-9]+(?: [a-z0-9]+)*")
+
+def _split_alternation(pattern):
+    """Top-level alternatives of a \b(a|b|...)\b pattern, or None if it isn't one."""
+    if not (pattern.startswith(r"\b(") and pattern.endswith(r")\b")):
+        return None
+    body = pattern[3:-3]
+    alts, depth, cur = [], 0, ""
+    for ch in body:
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+            if depth < 0:
+                return None  # the leading group closes before the end
+        if ch == "|" and depth == 0:
+            alts.append(cur)
+            cur = ""
+        else:
+            cur += ch
+    alts.append(cur)
+    return alts
+
+class KeywordTagger:
+    """Multi-label tagger: literal keywords via a word-level Aho-Corasick
+    automaton, regex-shaped leftovers via per-rule residual regexes."""
+    def __init__(self, rules):
+        self.labels = []
+        for label, _ in rules:
+            if label not in self.labels:
+                self.labels.append(label)
+        self.goto, self.fail, self.out = [{}], [0], [[]]
+        residual = {}  # label -> regex-shaped patterns, OR-ed into one regex per label
+        for label, pattern in rules:
+            alts = _split_alternation(pattern)
+            if alts is None:
+                residual.setdefault(label, []).append(pattern)
+                continue
+            regexy = [a for a in alts if not _LITERAL_RE.fullmatch(a)]
+            for alt in alts:
+                if _LITERAL_RE.fullmatch(alt):
+                    self._add(tuple(alt.split(" ")), label)
+            if regexy:
+                residual.setdefault(label, []).append(r"\b(" + "|".join(regexy) + r")\b")
+        self.residual = [(label, re.compile("|".join(f"(?:{p})" for p in pats)))
+                         for label, pats in residual.items()]
+        self._link()
+
+    def _add(self, words, label):
+        state = 0
+        for w in words:
+            nxt = self.goto[state].get(w)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[state][w] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.out.append([])
+            state = nxt
+        self.out[state].append((label, len(words)))
+
+    def _link(self):
+        """Breadth-first failure links; each state inherits its fallback's outputs."""
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for w, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and w not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(w, 0)
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def tag(self, title):
+        """Set of every label with at least one rule hit in `title`."""
+        text = title.lower()
+        hits = set()
+        spans = [(m.start(), m.end()) for m in _WORD_RE.finditer(text)]
+        goto, fail, out = self.goto, self.fail, self.out
+        state = 0
+        for j, (start, end) in enumerate(spans):
+            w = text[start:end]
+            while state and w not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(w, 0)
+            for label, k in out[state]:
+                # multi-word literals need exactly one space between their words
+                if k == 1 or all(spans[i][0] - spans[i - 1][1] == 1 and text[spans[i - 1][1]] == " "
+                                 for i in range(j - k + 2, j + 1)):
+                    hits.add(label)
+        for label, regex in self.residual:
+            if label not in hits and regex.search(text):
+                hits.add(label)
+        return hits
+
+    def tag_batch(self, titles):
+        return [self.tag(t) for t in titles]
+
+    def primary(self, hits):
+        """First-match label under the rule priority ("noise" wins, then SECTION order)."""
+        for label in self.labels:
+            if label in hits:
+                return label
+        return "Other"
+
+keyword_tagger = KeywordTagger(_CLASSIFY_RULES)
+
+# ---------- TRAINED SECTION CLASSIFIER ----------
+# Hashing-trick features (word unigrams + bigrams, crc32 into a fixed number
+# of buckets) and a linear softmax over the named sections, trained offline
+# from the archived CSVs by train_classifier.py. Inference is numpy only: a
+# batch becomes one (titles x distinct buckets) matrix multiplied against the
+# matching weight rows.
+def hashed_features(title, n_features):
+    """Bucket ids for a title's unigrams and bigrams; n_features is a power of two."""
+    words = _WORD_RE.findall(title.lower())
+    grams = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    return [zlib.crc32(g.encode("utf-8")) & (n_features - 1) for g in grams]
+
+def feature_matrix(titles, n_features):
+    """(X, buckets): X[i, j] counts bucket buckets[j] in titles[i], rows L2-normalised."""
+    feats = [hashed_features(t, n_features) for t in titles]
+    rows = np.repeat(np.arange(len(feats)), [len(f) for f in feats])
+    cols = np.fromiter((b for f in feats for b in f), dtype=np.int64, count=len(rows))
+    buckets, inverse = np.unique(cols, return_inverse=True)
+    X = np.bincount(rows * len(buckets) + inverse.ravel(), minlength=len(feats) * len(buckets))
+    X = X.reshape(len(feats), len(buckets)).astype(np.float32)
+    norms = np.linalg.norm(X, axis=1, keepdims=True)
+    return X / np.maximum(norms, 1.0), buckets
+
+class SectionClassifier:
+    """Linear model over hashed title features; weights (n_features x classes)."""
+    def __init__(self, weights, bias, classes):
+        self.weights = weights
+        self.bias = bias
+        self.classes = list(classes)
+        self.n_features = weights.shape[0]
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as z:
+            return cls(z["weights"].astype(np.float32), z["bias"].astype(np.float32), z["classes"].tolist())
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.savez_compressed(path, weights=self.weights.astype(np.float16),
+                            bias=self.bias.astype(np.float32), classes=np.array(self.classes))
+
+    def scores(self, titles):
+        X, buckets = feature_matrix(titles, self.n_features)
+        return X @ self.weights[buckets] + self.bias
+
+    def predict_proba(self, titles, batch=128):
+        # X is dense over the batch's distinct buckets, which grow with the
+        # batch: ~100 titles per matmul keeps it small and fastest
+        out = []
+        for i in range(0, len(titles), batch):
+            s = self.scores(titles[i:i + batch])
+            e = np.exp(s - s.max(axis=1, keepdims=True))
+            out.append(e / e.sum(axis=1, keepdims=True))
+        return np.vstack(out) if out else np.zeros((0, len(self.classes)), dtype=np.float32)
+
+    def predict(self, titles):
+        """[(section, probability)] per title."""
+        proba = self.predict_proba(titles)
+        best = proba.argmax(axis=1)
+        return [(self.classes[k], float(proba[i, k])) for i, k in enumerate(best)]
+
+_section_clf = None
+
+def section_classifier():
+    """The trained classifier, or None when disabled, untrained or numpy is missing."""
+    global _section_clf
+    if _section_clf is None:
+        _section_clf = False
+        if SECTION_CLF and np is not None and os.path.exists(SECTION_CLF_PATH):
+            try:
+                _section_clf = SectionClassifier.load(SECTION_CLF_PATH)
+            except (OSError, KeyError, ValueError) as e:
+                print(f"[WARN] section classifier not loaded: {e}")
+    return _section_clf or None
+
+# Dedupe keys: NFKC folds compatibility forms (full-width, ligatures), casefold
+# handles ß/İ/final sigma, and tokens are \w runs plus combining marks so
+# Devanagari/Thai/Arabic words keep their vowel signs. The token string is
+# hashed to a 16-byte blake2b digest, so the seen-set stays fixed-width.
+_COMBINING_MARKS = "".join(chr(c) for c in range(0x300, 0x10000) if unicodedata.category(chr(c))[0] == "M")
+_TOKEN_RE = re.compile(rf"[\w{re.escape(_COMBINING_MARKS)}]+")
+
+def title_tokens(title):
+    """Script-preserving, casefolded word tokens of a title."""
+    return _TOKEN_RE.findall(unicodedata.normalize("NFKC", title).casefold())
+
+def _digest(text):
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+def dedupe_key(it):
+    """Fixed-width title key for exact-repeat detection, or None for an untitled item."""
+    tokens = title_tokens(it.get("title_en") or it.get("title") or "")
+    return _digest(" ".join(tokens)) if tokens else None
+
+# URL identity: one article reaches us as AMP, mobile, www/bare-host and
+# utm-tagged variants. canonical_url folds those to one string: scheme and
+# www./m./amp. host prefixes dropped, host lowercased, AMP paths and AMP-cache
+# wrappers unwrapped, tracking params and the fragment removed, the remaining
+# query sorted.
+_TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "msclkid", "igshid", "mc_cid", "mc_eid", "ocid", "cmpid", "ncid",
+    "smid", "taid", "ref", "ref_src", "refsrc", "referrerpost", "homepageposition", "ctrack",
+    "cexp_id", "cexp_var", "guccounter", "guce_referrer", "guce_referrer_sig", "sr_share", "amp",
+}
+_HOST_PREFIXES = ("www.", "m.", "mobile.", "amp.")
+_AMP_CACHE_RE = re.compile(r"^/(?:amp/s/|c/s/|c/)(?P<rest>.+)$")
+
+def canonical_url(url):
+    """Variant-insensitive form of an article URL ("" for none)."""
+    url = (url or "").strip()
+    if not url:
+        return ""
+    parts = urlsplit(url if "//" in url else "//" + url)
+    host = (parts.hostname or "").rstrip(".")
+    path = parts.path or "/"
+    if host.endswith(".cdn.ampproject.org") or (host in ("google.com", "www.google.com") and path.startswith("/amp/")):
+        m = _AMP_CACHE_RE.match(path)
+        if m:
+            return canonical_url(m.group("rest") + (f"?{parts.query}" if parts.query else ""))
+    for prefix in _HOST_PREFIXES:
+        if host.startswith(prefix) and host.count(".") > 1:
+            host = host[len(prefix):]
+            break
+    if parts.port and parts.port not in (80, 443):
+        host = f"{host}:{parts.port}"
+    path = re.sub(r"(?:/amp|\.amp)(?=/?$)|/amp(?=/)", "", path, flags=re.I).rstrip("/") or "/"
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                   if not k.lower().startswith("utm_") and k.lower() not in _TRACKING_PARAMS
+                   and not (k.lower() == "outputtype" and v.lower() == "amp"))
+    return host + path + ("?" + urlencode(query) if query else "")
+
+def url_key(it):
+    """Fixed-width digest of the item's canonical URL, or None."""
+    url = canonical_url(it.get("url"))
+    return _digest("url " + url) if url else None
+
+def dedupe_items(items, near_dup_threshold=None):
+    """Drop exact repeats (same title tokens or same canonical URL), then
+    collapse near-duplicates; each survivor's cluster_size counts the copies
+    it stands for."""
+    seen = {}  # title and URL digests -> first item; both share one fixed-width set
     unique = []
     for it in items:
-        title = (it.get("title_en") or it.get("title") or "").strip().lower()
-        norm = re.sub(r"\s+", " ", re.sub(r"[^a-z0-9 ]", "", title))
-        key = norm or (it.get("url") or "")
-        if key and key not in seen:
-            seen.add(key)
+        keys = [k for k in (dedupe_key(it), url_key(it)) if k]
+        if not keys:
+            continue
+        first = next((seen[k] for k in keys if k in seen), None)
+        if first is None:
+            first = it
             unique.append(it)
+        else:
+            first["cluster_size"] = first.get("cluster_size", 1) + it.get("cluster_size", 1)
+        for k in keys:
+            seen.setdefault(k, first)
+    threshold = NEAR_DUP_THRESHOLD if near_dup_threshold is None else near_dup_threshold
+    if threshold > 0:
+        unique = collapse_near_duplicates(unique, threshold)
     return unique
 
+# ---------- NEAR-DUPLICATE CLUSTERING ----------
+# Syndicated copies of one story differ by a word or a suffix (" - Reuters").
+# Each title becomes a set of word shingles; a MinHash signature of
+# bands*rows values estimates Jaccard similarity, and LSH buckets titles that
+# agree on any whole band, so only colliding pairs are compared (roughly
+# linear in the batch instead of all pairs). Candidates are confirmed with
+# the exact shingle Jaccard and merged with union-find.
+_MINHASH_PRIME = (1 << 61) - 1
+
+def title_shingles(title):
+    """Token unigrams plus adjacent-token bigrams of a title."""
+    words = title_tokens(title)
+    return set(words) | {f"{a} {b}" for a, b in zip(words, words[1:])}
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+class MinHashLSH:
+    def __init__(self, bands=MINHASH_BANDS, rows=MINHASH_ROWS, seed=1):
+        rng = random.Random(seed)
+        self.bands, self.rows = bands, rows
+        self.perms = [(rng.randrange(1, _MINHASH_PRIME), rng.randrange(_MINHASH_PRIME))
+                      for _ in range(bands * rows)]
+
+    def signature(self, shingles):
+        hashes = [zlib.crc32(s.encode("utf-8")) for s in shingles]
+        return [min((a * h + b) % _MINHASH_PRIME for h in hashes) for a, b in self.perms]
+
+    def candidate_pairs(self, signatures):
+        """{(i, j)} for signatures that agree on at least one band."""
+        pairs = set()
+        for band in range(self.bands):
+            buckets = {}
+            lo = band * self.rows
+            for i, sig in enumerate(signatures):
+                if sig:
+                    buckets.setdefault(tuple(sig[lo:lo + self.rows]), []).append(i)
+            for members in buckets.values():
+                for x in range(len(members)):
+                    for y in range(x + 1, len(members)):
+                        pairs.add((members[x], members[y]))
+        return pairs
+
+def near_duplicate_clusters(titles, threshold=NEAR_DUP_THRESHOLD, lsh=None):
+    """Clusters (lists of indices, in input order) of titles with shingle Jaccard >= threshold."""
+    lsh = lsh or MinHashLSH()
+    shingles = [title_shingles(t) for t in titles]
+    signatures = [lsh.signature(s) if s else None for s in shingles]
+    parent = list(range(len(titles)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, j in lsh.candidate_pairs(signatures):
+        if jaccard(shingles[i], shingles[j]) >= threshold:
+            ri, rj = find(i), find(j)
+            if ri != rj:
+                parent[max(ri, rj)] = min(ri, rj)  # root = earliest member
+    clusters = {}
+    for i in range(len(titles)):
+        clusters.setdefault(find(i), []).append(i)
+    return list(clusters.values())
+
+def collapse_near_duplicates(items, threshold=NEAR_DUP_THRESHOLD):
+    """Keep the first item of each near-duplicate cluster, with cluster_size set."""
+    titles = [(it.get("title_en") or it.get("title") or "").strip() for it in items]
+    kept = []
+    for members in near_duplicate_clusters(titles, threshold):
+        rep = items[members[0]]
+        rep["cluster_size"] = sum(items[i].get("cluster_size", 1) for i in members)
+        kept.append(rep)
+    return kept
+
+# ---------- CROSS-DAY STORY INDEX ----------
+# Per indexed day, each story keeps an 8-byte URL digest, an 8-byte title-token
+# digest and its LSH band hashes (crc32 of each MinHash band). Lookups are dict
+# hits: URL, then title, then near-duplicate, where a story counts as seen when
+# enough of its bands match one earlier story for the band-agreement estimate
+# of Jaccard to clear NEAR_DUP_THRESHOLD. Keys come from the original title so
+# they don't depend on translation. Days older than the retention window are
+# dropped on every update.
+def _short_digest(text):
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+
+def story_keys(it, lsh):
+    """(url digest, title digest, band hashes) for an item; parts may be None/[]."""
+    url = canonical_url(it.get("url"))
+    tokens = title_tokens(it.get("title") or it.get("title_en") or "")
+    shingles = set(tokens) | {f"{a} {b}" for a, b in zip(tokens, tokens[1:])}
+    bands = []
+    if shingles:
+        sig = lsh.signature(shingles)
+        bands = [zlib.crc32(repr((band, sig[band * lsh.rows:(band + 1) * lsh.rows])).encode())
+                 for band in range(lsh.bands)]
+    return (_short_digest(url) if url else None,
+            _short_digest(" ".join(tokens)) if tokens else None,
+            bands)
+
+class StoryIndex:
+    def __init__(self, path=STORY_INDEX_PATH, retention_days=STORY_INDEX_DAYS, threshold=NEAR_DUP_THRESHOLD):
+        self.path = path
+        self.retention_days = retention_days
+        self.lsh = MinHashLSH()
+        # the share of agreeing bands estimates J**rows; require that share for J >= threshold
+        self.min_bands = max(1, math.ceil(self.lsh.bands * threshold ** self.lsh.rows))
+        self.days = {}  # day -> [[url_digest, title_digest, [band hashes]], ...]
+        self._reindex()
+
+    def _reindex(self):
+        self.urls, self.titles, self.bands, self.story_day = {}, {}, {}, []
+        for day in sorted(self.days):
+            for url, title, bands in self.days[day]:
+                sid = len(self.story_day)
+                self.story_day.append(day)
+                if url:
+                    self.urls[url] = day
+                if title:
+                    self.titles[title] = day
+                for b in bands:
+                    self.bands.setdefault(b, []).append(sid)
+
+    @classmethod
+    def load(cls, path=STORY_INDEX_PATH, today=None):
+        """The saved index, or one bootstrapped from data/raw when there is none."""
+        index = cls(path)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                index.days = json.load(f)["days"]
+        except FileNotFoundError:
+            index.bootstrap(today or date.today().isoformat())
+        except (OSError, ValueError, KeyError) as e:
+            print(f"[Index] unreadable, rebuilding from data/raw: {e}")
+            index.bootstrap(today or date.today().isoformat())
+        index._reindex()
+        return index
+
+    def bootstrap(self, today, raw_dir="data/raw"):
+        start = (date.fromisoformat(today) - timedelta(days=self.retention_days)).isoformat()
+        for name in sorted(os.listdir(raw_dir)) if os.path.isdir(raw_dir) else []:
+            day = name[:-5]
+            if not name.endswith(".json") or not start <= day < today:
+                continue
+            try:
+                self.days[day] = [list(story_keys(it, self.lsh)) for it in load_raw_items(os.path.join(raw_dir, name))]
+            except ValueError as e:
+                print(f"[Index] skipping {name}: {e}")
+        self._reindex()
+        print(f"[Index] bootstrapped {sum(map(len, self.days.values()))} stories from {len(self.days)} days")
+
+    def seen(self, it, today):
+        """(earlier day, "url" | "title" | "near-dup") if the story ran before today, else None."""
+        url, title, bands = story_keys(it, self.lsh)
+        if url and self.urls.get(url, today) < today:
+            return self.urls[url], "url"
+        if title and self.titles.get(title, today) < today:
+            return self.titles[title], "title"
+        votes = Counter(sid for b in bands for sid in self.bands.get(b, ()) if self.story_day[sid] < today)
+        if votes:
+            sid, n = votes.most_common(1)[0]
+            if n >= self.min_bands:
+                return self.story_day[sid], "near-dup"
+        return None
+
+    def filter(self, items, today, mode=STORY_REPEATS):
+        """Drop (or mark with seen_on and move last) items briefed on an earlier day."""
+        fresh, repeats, reasons = [], [], Counter()
+        for it in items:
+            hit = self.seen(it, today)
+            if hit:
+                reasons[hit[1]] += 1
+                it["seen_on"] = hit[0]
+                repeats.append(it)
+            else:
+                fresh.append(it)
+        _run_stats["story_index"] = {"repeats": len(repeats), "mode": mode, **reasons}
+        print(f"[Index] {len(repeats)}/{len(items)} already briefed in the last {self.retention_days} days "
+              f"({', '.join(f'{k} {v}' for k, v in reasons.items()) or 'none'}); {mode}")
+        return fresh if mode == "drop" else fresh + repeats
+
+    def digest(self, today):
+        """Fingerprint of what seen() consults for `today` (the days before it)."""
+        return fingerprint({d: v for d, v in sorted(self.days.items()) if d < today})
+
+    def add_day(self, day, items):
+        """Index (replacing) a day's stories and drop days past retention."""
+        self.days[day] = [list(story_keys(it, self.lsh)) for it in items]
+        cutoff = (date.fromisoformat(day) - timedelta(days=self.retention_days)).isoformat()
+        self.days = {d: v for d, v in self.days.items() if d >= cutoff}
+        self._reindex()
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            json.dump({"days": self.days}, f, separators=(",", ":"))
+        os.replace(tmp, self.path)
+
 # ---------- TRANSLATION ----------
-def _is_non_english_text(text):
-    """Detect if text contains non-English characters (CJK, Cyrillic, Arabic, etc.)."""
-    if not text:
+# Script detection: one sorted range table, looked up with bisect per letter
+# (ASCII skips the lookup). Only letters count, so digits, tickers and
+# punctuation don't dilute the proportions. Accented Latin is still Latin:
+# "Nestlé" or "Société Générale" in an English headline is not a reason to
+# translate.
+_SCRIPT_RANGES = [
+    (0x0041, 0x024F, "Latin"), (0x0370, 0x03FF, "Greek"), (0x0400, 0x052F, "Cyrillic"),
+    (0x0530, 0x058F, "Armenian"), (0x0590, 0x05FF, "Hebrew"), (0x0600, 0x06FF, "Arabic"),
+    (0x0750, 0x077F, "Arabic"), (0x08A0, 0x08FF, "Arabic"), (0x0900, 0x0DFF, "Indic"),
+    (0x0E00, 0x0EFF, "Thai"), (0x10A0, 0x10FF, "Georgian"), (0x1100, 0x11FF, "Hangul"),
+    (0x1E00, 0x1EFF, "Latin"), (0x1F00, 0x1FFF, "Greek"), (0x3040, 0x30FF, "Kana"),
+    (0x3130, 0x318F, "Hangul"), (0x3400, 0x4DBF, "Han"), (0x4E00, 0x9FFF, "Han"),
+    (0xAC00, 0xD7AF, "Hangul"), (0xF900, 0xFAFF, "Han"), (0xFB50, 0xFDFF, "Arabic"),
+    (0xFE70, 0xFEFF, "Arabic"),
+]
+_SCRIPT_STARTS = [lo for lo, _, _ in _SCRIPT_RANGES]
+
+def _script_of(ch):
+    cp = ord(ch)
+    i = bisect.bisect_right(_SCRIPT_STARTS, cp) - 1
+    if i >= 0 and cp <= _SCRIPT_RANGES[i][1]:
+        return _SCRIPT_RANGES[i][2]
+    return "Other"
+
+_ASCII_LETTERS = bytes(range(65, 91)) + bytes(range(97, 123))
+
+def script_profiles(titles):
+    """Per title, {script: share of its letters}; {} for titles without letters."""
+    cache = {}  # char -> script ("" for non-letters), shared across the batch
+    out = []
+    for title in titles:
+        if title.isascii():
+            raw = title.encode("ascii")
+            letters = len(raw) - len(raw.translate(None, _ASCII_LETTERS))
+            out.append({"Latin": 1.0} if letters else {})
+            continue
+        counts = {}
+        letters = 0
+        for ch, n in Counter(title).items():
+            script = cache.get(ch)
+            if script is None:
+                script = cache[ch] = _script_of(ch) if ch.isalpha() else ""
+            if script:
+                counts[script] = counts.get(script, 0) + n
+                letters += n
+        out.append({k: v / letters for k, v in counts.items()})
+    return out
+
+# GDELT reports language names ("English"), Marketaux ISO codes ("en")
+_LANGUAGE_CODES = {
+    "english": "en", "french": "fr", "german": "de", "spanish": "es", "italian": "it",
+    "portuguese": "pt", "chinese": "zh", "japanese": "ja", "korean": "ko", "russian": "ru",
+    "arabic": "ar", "greek": "el", "polish": "pl", "czech": "cs", "turkish": "tr",
+    "dutch": "nl", "romanian": "ro", "hungarian": "hu", "danish": "da", "vietnamese": "vi",
+    "indonesian": "id", "hindi": "hi", "ukrainian": "uk",
+}
+
+def normalize_language(lang):
+    """ISO-ish lowercase language code, or None when the provider gave none."""
+    lang = (lang or "").strip().lower()
+    return _LANGUAGE_CODES.get(lang, lang) or None
+
+def needs_translation(profile, lang):
+    """Route a title: mostly non-Latin letters always translate; otherwise the
+    provider language decides, and a Latin title with no language stays."""
+    if not profile:
         return False
-    for ch in text[:50]:
-        cp = ord(ch)
-        # CJK Unified Ideographs, Hangul, Cyrillic, Arabic, Greek, etc.
-        if any([
-            0x4E00 <= cp <= 0x9FFF,   # CJK
-            0xAC00 <= cp <= 0xD7AF,   # Hangul
-            0x0400 <= cp <= 0x04FF,   # Cyrillic
-            0x0600 <= cp <= 0x06FF,   # Arabic
-            0x0370 <= cp <= 0x03FF,   # Greek
-            0x0080 <= cp <= 0x024F,   # Latin Extended (accented chars)
-            0x1E00 <= cp <= 0x1EFF,   # Latin Extended Additional
-            0x3040 <= cp <= 0x309F,   # Hiragana
-            0x30A0 <= cp <= 0x30FF,   # Katakana
-        ]):
-            return True
-    return False
+    if 1.0 - profile.get("Latin", 0.0) >= TRANSLATE_SCRIPT_SHARE:
+        return True
+    code = normalize_language(lang)
+    return code is not None and code != "en"
+
+class TranslationMemo:
+    """Cross-day headline translations keyed by (normalized title, language).
+
+    GDELT syndication brings the same foreign headlines back day after day;
+    a hit fills title_en without an LLM call. Each entry carries the day it
+    was last used, and the least recently used are dropped past
+    `max_entries`. On disk the entries are sorted by key, one per line, so a
+    day's commit only touches the entries that were added or used.
+    """
+    def __init__(self, path, max_entries):
+        self.path = path
+        self.max_entries = max_entries
+        self.entries = {}  # (title, lang) -> [text, last used day]
+        self.today = date.today().isoformat()
+        self.hits = self.misses = 0
+        if os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    for title, lang, text, *used in json.load(f):
+                        self.entries[(title, lang)] = [text, used[0] if used else ""]
+            except (OSError, ValueError) as e:
+                print(f"[Translate] memo unreadable, starting fresh: {e}")
+
+    @staticmethod
+    def key(title, lang):
+        norm = " ".join(unicodedata.normalize("NFKC", title).split()).casefold()
+        return norm, (lang or "auto").strip().lower()
+
+    def get(self, title, lang):
+        entry = self.entries.get(self.key(title, lang))
+        if entry is None:
+            self.misses += 1
+            return None
+        entry[1] = self.today
+        self.hits += 1
+        return entry[0]
 
-def translate_non_english(items):
+    def put(self, title, lang, text):
+        self.entries[self.key(title, lang)] = [text, self.today]
+        if len(self.entries) > self.max_entries:
+            by_age = sorted(self.entries, key=lambda k: (self.entries[k][1], k))
+            for k in by_age[:len(self.entries) - self.max_entries]:
+                del self.entries[k]
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        lines = [json.dumps([t, l, x, used], ensure_ascii=False) for (t, l), (x, used) in sorted(self.entries.items())]
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write("[\n" + ",\n".join(lines) + "\n]\n")
+        os.replace(tmp, self.path)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        rate = self.hits / lookups if lookups else 0.0
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": round(rate, 3)}
+
+def translate_non_english(items, save_memo=None):
     if not TRANSLATE_TO_EN:
         return items
+    memo = TranslationMemo(TRANSLATION_MEMO_PATH, TRANSLATION_MEMO_MAX)
     to_xlate = []
-    for i, it in enumerate(items):
-        title = it.get("title", "")
-        if not title:
-            continue
+    candidates = [(i, it) for i, it in enumerate(items) if it.get("title") and not it.get("title_en")]
+    profiles = script_profiles([it["title"] for _, it in candidates])
+    routed = 0
+    for (i, it), profile in zip(candidates, profiles):
+        title = it["title"]
         lang = it.get("language") or ""
-        # Translate if: explicit non-English language, OR text has non-English chars
-        if (lang and lang != "en") or _is_non_english_text(title):
-            to_xlate.append((i, title, lang or "auto"))
-    if not to_xlate:
-        return items
-    batch = [f"[{i}] ({lang}) {ttl}" for i, ttl, lang in to_xlate]
+        if needs_translation(profile, lang):
+            routed += 1
+            known = memo.get(title, lang)
+            if known:
+                it["title_en"] = known
+            else:
+                to_xlate.append((i, title, lang or "auto"))
+    st = memo.stats()
+    _run_stats["translation_memo"] = st
+    _run_stats["translation_routing"] = {"candidates": len(candidates), "routed": routed}
+    print(f"[Translate] routed {routed}/{len(candidates)} untranslated headlines")
+    print(f"[Translate] memo: {st['hits']}/{st['hits'] + st['misses']} hits ({st['hit_rate']:.0%})")
+    pending = to_xlate
+    for attempt in range(TRANSLATE_RETRY_ROUNDS + 1):
+        if not pending:
+            break
+        if attempt:
+            print(f"[Translate] re-requesting {len(pending)} missing headlines")
+        chunks = _chunk_by_tokens(pending, TRANSLATE_CHUNK_TOKENS)
+        results = run_llm_jobs({n: (_translate_chunk, (chunk,)) for n, chunk in enumerate(chunks)},
+                               fallbacks={n: {} for n in range(len(chunks))})
+        done = {}
+        for part in results.values():
+            done.update(part)
+        for i, ttl, lang in pending:
+            if i in done:
+                items[i]["title_en"] = done[i]
+                memo.put(ttl, lang, done[i])
+        pending = [e for e in pending if e[0] not in done]
+    if pending:
+        print(f"[Translate] {len(pending)} headlines left untranslated")
+    if not DRY_RUN if save_memo is None else save_memo:
+        memo.save()
+    return items
+
+def _estimate_tokens(text):
+    """Rough token count: CJK/wide chars ~1 token each, everything else ~4 chars/token."""
+    wide = sum(1 for ch in text if ord(ch) >= 0x2E80)
+    return wide + (len(text) - wide) // 4 + 1
+
+def _chunk_by_tokens(entries, budget):
+    """Greedily pack (index, title, lang) entries into chunks of ~`budget` prompt tokens."""
+    chunks, cur, used = [], [], 0
+    for entry in entries:
+        cost = _estimate_tokens(entry[1]) + 8  # "[N] (lang) " prefix
+        if cur and used + cost > budget:
+            chunks.append(cur)
+            cur, used = [], 0
+        cur.append(entry)
+        used += cost
+    if cur:
+        chunks.append(cur)
+    return chunks
+
+def _translate_chunk(chunk):
+    """Translate one chunk; return {item index: English title} for the lines that came back."""
+    batch = [f"[{i}] ({lang}) {ttl}" for i, ttl, lang in chunk]
     prompt = "Translate each headline to English. Keep the [N] prefix. Output one per line:\n\n" + "\n".join(batch)
     msgs = [{"role":"system","content":"You translate headlines. Keep [N] prefix. Output one per line."},
             {"role":"user","content":prompt}]
-    result = call_llm(msgs, max_tokens=3000, temperature=0.1, extra_params=REASONING)
-    if not result:
-        return items
+    # English output runs ~1-2x the source tokens; reasoning needs its own headroom
+    est = sum(_estimate_tokens(ttl) for _, ttl, _ in chunk)
+    result = call_llm(msgs, max_tokens=TRANSLATE_REASONING_TOKENS + 3 * est, temperature=0.1,
+                      extra_params=REASONING, purpose="translate")
+    wanted = {i for i, _, _ in chunk}
+    out = {}
     for line in result.split("\n"):
         m = re.match(r"\[(\d+)\]\s*(.*)", line.strip())
         if m:
             idx = int(m.group(1))
             translated = m.group(2).strip()
-            if idx < len(items) and translated:
-                items[idx]["title_en"] = translated
-    return items
+            if idx in wanted and translated:
+                out[idx] = translated
+    return out
 
 # ---------- TODAY AT A GLANCE (Guiding Summary) ----------
 def write_glance(grouped):
@@ -316,7 +1729,7 @@ def write_glance(grouped):
         if not articles:
             continue
         top = articles[0]
-        ttl = (top.get("title_en") or top.get("title") or "").strip()
+        ttl = display_title(top)
         items_summary.append(f"{section}: {ttl}")
     context = "\n".join(items_summary) if items_summary else "No headlines today."
     prompt = (
@@ -332,16 +1745,14 @@ def write_glance(grouped):
     )
     msgs = [{"role":"system","content":"You write tight, specific financial guidance. Name names. Give context."},
             {"role":"user","content":prompt}]
-    return call_llm(msgs, max_tokens=2000, temperature=0.3, extra_params=REASONING)
+    return call_llm(msgs, max_tokens=2000, temperature=0.3, extra_params=REASONING, purpose="glance",
+                    on_skip=BUDGET_SKIP_MARKER)
 
 # ---------- SECTION BRIEF (Headline bulletins + Why this matters) ----------
-def write_section_brief(section, items):
-    if not items:
-        return "", ""
-    # Headline bulletins
+def section_headlines(items):
     bullets = []
     for it in items[:12]:
-        ttl = (it.get("title_en") or it.get("title") or "").strip()
+        ttl = display_title(it)
         url_ = it.get("url") or ""
         src = (it.get("source") or "").strip()
         if url_:
@@ -349,32 +1760,51 @@ def write_section_brief(section, items):
         else:
             b = f"**{ttl}** — ({src})"
         bullets.append(b)
-    headlines = "\n".join(bullets)
+    return "\n".join(bullets)
+
+def _outlets(it):
+    n = it.get("cluster_size", 1)
+    return f", carried by {n} outlets" if n > 1 else ""
+
+# Shared by the per-section prompts and the single-call prompt, so both modes see the same input
+WHY_GUIDANCE = (
+    "Be SPECIFIC: name companies, tickers, sectors, numbers, percentages.\n"
+    "Connect the dots between headlines. What's the implication?\n"
+    "Example: 'NVIDIA's new GPU announcement puts pressure on AMD (AMD) — watch for competitive response next week.'\n"
+    "NOT vague: 'This highlights the ongoing challenges in the tech sector.'\n"
+)
+
+def why_context(section, items):
+    """Headline lines a section's 'Why this matters' is written from."""
+    if section == "Other":
+        return "\n".join(f"- {display_title(it)}" for it in items[:5])
+    return "\n".join(f"- {display_title(it)} ({(it.get('source') or '').strip()}{_outlets(it)})" for it in items[:8])
+
+def write_section_brief(section, items):
+    if not items:
+        return "", ""
+    # Headline bulletins
+    headlines = section_headlines(items)
     
     # Why this matters (per section)
-    context = "\n".join([f"- {(it.get('title_en') or it.get('title') or '').strip()} ({(it.get('source') or '').strip()})" for it in items[:8]])
     prompt = (
         f"Section: {section}\n\n"
-        f"Headlines:\n{context}\n\n"
+        f"Headlines:\n{why_context(section, items)}\n\n"
         "Write 'Why this matters' for THIS section only — 2-4 bullet points.\n"
-        "Be SPECIFIC: name companies, tickers, sectors, numbers, percentages.\n"
-        "Connect the dots between headlines. What's the implication?\n"
-        "Example: 'NVIDIA's new GPU announcement puts pressure on AMD (AMD) — watch for competitive response next week.'\n"
-        "NOT vague: 'This highlights the ongoing challenges in the tech sector.'\n"
+        + WHY_GUIDANCE
     )
     msgs = [{"role":"system","content":"You write specific, actionable financial analysis. Name names and numbers."},
             {"role":"user","content":prompt}]
-    why = call_llm(msgs, max_tokens=1000, temperature=0.3, extra_params=REASONING)
+    why = call_llm(msgs, max_tokens=1000, temperature=0.3, extra_params=REASONING, purpose=section,
+                   on_skip=BUDGET_SKIP_MARKER)
     return headlines, why
 
 # ---------- OTHER SECTION (Ticker format, gated, translated) ----------
-def write_other_brief(items):
-    if not items:
-        return "", ""
+def other_headlines(items):
     # Take max 8 items, flag country where possible
     entries = []
     for it in items[:8]:
-        ttl = (it.get("title_en") or it.get("title") or "").strip()
+        ttl = display_title(it)
         src = (it.get("source") or "").strip()
         url_ = it.get("url") or ""
         # Try to extract country flag from title
@@ -389,28 +1819,140 @@ def write_other_brief(items):
             entries.append(f"- {flag} **{ttl}** [→ {src}]({url_})")
         else:
             entries.append(f"- {flag} **{ttl}** ({src})")
-    headlines = "\n".join(entries)
+    return "\n".join(entries)
+
+def write_other_brief(items):
+    if not items:
+        return "", ""
+    headlines = other_headlines(items)
     # Why matters for Other
-    context = "\n".join([f"- {(it.get('title_en') or it.get('title') or '').strip()}" for it in items[:5]])
     prompt = (
         "From these miscellaneous headlines, write 1-2 'Why this matters' bullets.\n"
         "Only if there's a clear signal. If all noise, say 'No significant implications.'\n\n"
-        f"Items:\n{context}"
+        f"Items:\n{why_context('Other', items)}"
     )
     msgs = [{"role":"system","content":"You are a financial analyst. Be concise. Only flag if there's a real signal."},
             {"role":"user","content":prompt}]
-    why = call_llm(msgs, max_tokens=800, temperature=0.2, extra_params=REASONING)
+    why = call_llm(msgs, max_tokens=800, temperature=0.2, extra_params=REASONING, purpose="Other",
+                   on_skip=BUDGET_SKIP_MARKER)
     return headlines, why
 
 # ---------- BUILD THE BRIEF ----------
-def build_brief(items):
-    tagged = tag_headlines(items)
+def run_llm_jobs(jobs, max_workers=LLM_CONCURRENCY, fallbacks=None):
+    """Run {key: (fn, args)} on a thread pool; return {key: result}.
+
+    Jobs start in dict order, so callers list them by priority. Results are
+    keyed, so callers assemble output in their own order no matter which call
+    finishes first. Jobs still unfinished when the LLM time budget (plus
+    grace) runs out get fallbacks[key] instead of holding up the run; their
+    requests are timed out at that same deadline, so the threads exit too.
+    """
+    if not jobs:
+        return {}
+    fallbacks = fallbacks or {}
+    pool = ThreadPoolExecutor(max_workers=min(max_workers, len(jobs)))
+    futures = {key: pool.submit(fn, *args) for key, (fn, args) in jobs.items()}
+    done, late = wait(futures.values(), timeout=llm_budget.wait_timeout())
+    pool.shutdown(wait=not late, cancel_futures=True)
+    if late:
+        global _llm_abandoned
+        with _llm_calls_lock:
+            _llm_abandoned += len(late)
+        print(f"[LLM] time budget exhausted, {len(late)} calls abandoned")
+    return {key: fut.result() if fut in done else fallbacks.get(key) for key, fut in futures.items()}
+
+# ---------- SINGLE-CALL MODE (all "Why this matters" blocks in one JSON reply) ----------
+def _parse_json_object(text):
+    """Pull the outermost {...} out of a reply (tolerates ```json fences / prose)."""
+    start, end = text.find("{"), text.rfind("}")
+    if start < 0 or end <= start:
+        return {}
+    try:
+        obj = json.loads(text[start:end + 1])
+    except ValueError:
+        return {}
+    return obj if isinstance(obj, dict) else {}
+
+def write_all_whys(grouped, sections):
+    """One call for every section's 'Why this matters'. Returns {section: why};
+    sections whose entry is missing or malformed are left out."""
+    blocks = []
+    for section in sections:
+        blocks.append(f"## {section}\n{why_context(section, grouped[section])}")
+    prompt = (
+        "For EACH section below, write 'Why this matters' for that section only.\n"
+        "- Regular sections: 2-4 bullet points.\n"
+        "- \"Other\": 1-2 bullets, only if there's a clear signal; if all noise, say 'No significant implications.'\n"
+        + WHY_GUIDANCE + "\n"
+        "Reply with ONLY a JSON object mapping each section name exactly as given to a "
+        "Markdown bullet list string.\n\n" + "\n\n".join(blocks)
+    )
+    msgs = [{"role":"system","content":"You write specific, actionable financial analysis. Name names and numbers. Output JSON."},
+            {"role":"user","content":prompt}]
+    reply = call_llm(msgs, max_tokens=1000 + 600 * len(sections), temperature=0.3,
+                     extra_params=REASONING, purpose="whys")
+    whys = {}
+    for section, value in _parse_json_object(reply).items():
+        if isinstance(value, list):
+            value = "\n".join(f"- {str(v).lstrip('-* ').strip()}" for v in value if str(v).strip())
+        if section in sections and isinstance(value, str) and value.strip():
+            whys[section] = value.strip()
+    return whys
+
+def _section_job(section, items):
+    if section == "Other":
+        return (write_other_brief, (items,))
+    return (write_section_brief, (section, items))
+
+def build_sections(grouped, mode=BRIEF_WHY_MODE):
+    """Return (glance, {section: (headlines, why)}) for every non-empty section.
+
+    "fanout" sends one call per section; "single" asks for every section in
+    one JSON reply and falls back to per-section calls for entries that
+    didn't parse. All calls for a mode go out at once, capped by LLM_CONCURRENCY.
+    """
+    # Priority = submission order: glance, then sections in SECTION_ORDER ("Other" last)
+    sections = [s for s in SECTION_ORDER if grouped.get(s)]
+    heads = {s: other_headlines(grouped[s]) if s == "Other" else section_headlines(grouped[s])
+             for s in sections}
+    # If the budget runs out mid-call, headlines still ship with a marker
+    fallbacks = {"__glance__": "", "__whys__": {}}
+    fallbacks.update({s: (heads[s], BUDGET_SKIP_MARKER) for s in sections})
+    if mode != "single":
+        jobs = {"__glance__": (write_glance, (grouped,))}
+        jobs.update({s: _section_job(s, grouped[s]) for s in sections})
+        results = run_llm_jobs(jobs, fallbacks=fallbacks)
+        return results.pop("__glance__"), results
+    
+    results = run_llm_jobs({"__glance__": (write_glance, (grouped,)),
+                            "__whys__": (write_all_whys, (grouped, sections))}, fallbacks=fallbacks)
+    whys = results["__whys__"]
+    missing = [s for s in sections if s not in whys]
+    if missing:
+        print(f"[Build] single-call reply missing {len(missing)} sections, falling back: {', '.join(missing)}")
+    out = run_llm_jobs({s: _section_job(s, grouped[s]) for s in missing}, fallbacks=fallbacks)
+    for s in sections:
+        if s not in out:
+            out[s] = (heads[s], whys[s])
+    return results["__glance__"], out
+
+def group_by_section(items):
     grouped = {k: [] for k in SECTION_ORDER}
-    for it, tag in tagged:
+    for it, tag in tag_headlines(items):
         grouped.setdefault(tag, []).append(it)
+    for articles in grouped.values():
+        # widely syndicated stories lead; demoted repeats of earlier days go last
+        articles.sort(key=lambda it: ("seen_on" in it, -it.get("cluster_size", 1)))
+    return grouped
+
+def build_brief(items):
+    grouped = group_by_section(items)
+    
+    if not any(grouped.values()):
+        return "# Daily Financial Brief\n\n_No headlines available today._"
     
-    # "Today at a Glance" guiding summary
-    glance = write_glance(grouped)
+    # "Today at a Glance" guiding summary + per-section briefs
+    glance, results = build_sections(grouped)
     
     md = ["# Daily Financial Brief", ""]
     if glance:
@@ -418,14 +1960,10 @@ def build_brief(items):
     
     md += ["## Daily Brief", ""]
     for section in SECTION_ORDER:
-        section_items = grouped.get(section, [])
-        if not section_items:
+        if section not in results:
             continue
         md.append(f"### {section}")
-        if section == "Other":
-            head, why = write_other_brief(section_items)
-        else:
-            head, why = write_section_brief(section, section_items)
+        head, why = results[section]
         if head:
             md.append(head)
             md.append("")
@@ -434,49 +1972,53 @@ def build_brief(items):
             md.append(why)
             md.append("")
     
-    if not any(grouped.values()):
-        return "# Daily Financial Brief\n\n_No headlines available today._"
-    
     return "\n".join(md)
 
 # ---------- OUTPUT ----------
-def build_static_site(md_text, today):
-    import markdown, shutil
+_PAGE_HEAD = """<!doctype html>
+<html lang="en"><meta charset="utf-8">
+<title>{title}</title>
+<meta name="viewport" content="width=device-width,initial-scale=1">
+<link rel="stylesheet" href="https://unpkg.com/mvp.css">
+<body><main class="container">"""
+
+def write_day_page(md_text, day):
+    """Render docs/days/<day>.html; returns its path."""
+    import markdown
     os.makedirs("docs/days", exist_ok=True)
     nojekyll = "docs/.nojekyll"
     if not os.path.exists(nojekyll):
         open(nojekyll, "a").close()
     
     html_body = markdown.markdown(md_text, extensions=["extra", "sane_lists", "toc", "attr_list"])
-    day_html = f"docs/days/{today}.html"
-    page = f"""<!doctype html>
-<html lang="en"><meta charset="utf-8">
-<title>Daily Financial Brief — {today}</title>
-<meta name="viewport" content="width=device-width,initial-scale=1">
-<link rel="stylesheet" href="https://unpkg.com/mvp.css">
-<body><main class="container">
-<header><h1>Daily Financial Brief — {today}</h1></header>
+    day_html = f"docs/days/{day}.html"
+    page = _PAGE_HEAD.format(title=f"Daily Financial Brief — {day}") + f"""
+<header><h1>Daily Financial Brief — {day}</h1></header>
 {html_body}
 <hr><p><a href="../index.html">← Back to archive</a></p>
 </main></body></html>"""
     with open(day_html, "w", encoding="utf-8") as f:
         f.write(page)
-    
+    return day_html
+
+def write_site_index(latest=None):
+    """Rebuild docs/index.html over every day page; `latest` defaults to the newest."""
     pages = sorted([p for p in os.listdir("docs/days") if p.endswith(".html")], reverse=True)
+    latest = latest or (pages[0][:-5] if pages else "")
     links = "\n".join([f'<li><a href="./days/{p}">{p[:-5]}</a></li>' for p in pages])
-    index = f"""<!doctype html>
-<html lang="en"><meta charset="utf-8">
-<title>Financial News Brief — Archive</title>
-<meta name="viewport" content="width=device-width,initial-scale=1">
-<link rel="stylesheet" href="https://unpkg.com/mvp.css">
-<body><main class="container">
+    index = _PAGE_HEAD.format(title="Financial News Brief — Archive") + f"""
 <header><h1>Financial News Brief</h1><p>Auto-published daily.</p></header>
-<p><strong>Latest:</strong> <a href="./days/{today}.html">{today}</a></p>
+<p><strong>Latest:</strong> <a href="./days/{latest}.html">{latest}</a></p>
 <h2>Archive</h2><ul>{links}</ul>
 <p><a href="{SITE_BASE_URL}/latest.html">Stable link for today</a></p>
 </main></body></html>"""
     with open("docs/index.html", "w", encoding="utf-8") as f:
         f.write(index)
+
+def build_static_site(md_text, today):
+    import shutil
+    day_html = write_day_page(md_text, today)
+    write_site_index(latest=today)
     shutil.copyfile(day_html, "docs/latest.html")
     print(f"🌐 Built: docs/ (index.html, latest.html, days/{today}.html)")
 
@@ -501,22 +2043,53 @@ def email_brief(today):
                   "html": html + f'<p><a href="{SITE_BASE_URL}/latest.html">Read on web</a></p>'},
             timeout=30)
         print(f"📧 Email sent: {r.status_code}")
+        return r.ok
     except Exception as e:
         print(f"📧 Email error: {e}")
+        return False
 
 def save_csv(items, today):
     with open(f"out/{today}.csv", "w", newline="", encoding="utf-8") as f:
         w = csv.writer(f)
-        w.writerow(["title", "title_en", "source", "url", "published_at", "language", "section"])
-        tagged = tag_headlines(items)
-        for it, tag in tagged:
+        w.writerow(["title", "title_en", "source", "url", "published_at", "language", "section", "section_by"])
+        for it, tag in tag_headlines(items):
             w.writerow([it.get("title",""), it.get("title_en",""), it.get("source",""),
-                        it.get("url",""), it.get("published_at",""), it.get("language",""), tag])
+                        it.get("url",""), it.get("published_at",""), it.get("language",""), tag,
+                        it.get("section_by","")])
+
+def load_raw_items(path):
+    """Load a data/raw day file; older days wrap the list as {"count", "data"}."""
+    with open(path, encoding="utf-8") as f:
+        payload = json.load(f)
+    if isinstance(payload, dict):
+        return payload.get("data") or []
+    return payload
+
+def archived_days(start=None, end=None, last=None, raw_dir="data/raw"):
+    """[(day, path)] for data/raw/<day>.json, optionally bounded by date or count."""
+    days = []
+    for name in sorted(os.listdir(raw_dir)) if os.path.isdir(raw_dir) else []:
+        day = name[:-5]
+        if not name.endswith(".json") or (start and day < start) or (end and day > end):
+            continue
+        days.append((day, os.path.join(raw_dir, name)))
+    return days[-last:] if last else days
+
+def with_translations(raw, items):
+    """`raw` with title_en filled from the translated `items`, matched by
+    article id and title, so every copy of a translated headline keeps it."""
+    known = {(_article_id(it), it["title"]): it["title_en"] for it in items if it.get("title_en") and it.get("title")}
+    for it in raw:
+        en = known.get((_article_id(it), it.get("title")))
+        if en and not it.get("title_en"):
+            it["title_en"] = en
+    return raw
 
 def save_json(items, today):
     os.makedirs("data/raw", exist_ok=True)
+    raw = [{k: v for k, v in it.items() if k not in DERIVED_FIELDS} for it in items]
     with open(f"data/raw/{today}.json", "w", encoding="utf-8") as f:
-        json.dump(items, f, ensure_ascii=False, indent=2)
+        json.dump(raw, f, ensure_ascii=False, indent=2)
 
 # ---------- LOOM / GRIMOIRE INTEGRATION ----------
 def save_to_grimoire(md_text, today):
@@ -537,6 +2110,105 @@ def save_to_grimoire(md_text, today):
         f.write(f"- Created: atoms/{os.path.basename(atom_path)}\n")
         f.write(f"- Site: {SITE_BASE_URL}/days/{today}.html\n\n")
     print(f"📚 Saved to Grimoire: {atom_path}")
+    return atom_path
+
+# ---------- CHECKPOINTS ----------
+# Each stage writes WORK_DIR/<day>/<stage>.json holding its output, the
+# fingerprint of its inputs (config + the upstream output's digest) and the
+# digest of its own output. A rerun reuses a stage while its fingerprint
+# matches, so after a crash in the save stage the paid-for LLM output is
+# reloaded instead of regenerated, and a config change only reruns the stages
+# downstream of it. Side effects (email, archive log) leave a .done marker so
+# they happen once per day.
+def fingerprint(*parts):
+    blob = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()[:16]
+
+def _file_digest(path):
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()[:16]
+    except OSError:
+        return None
+
+def _code_digest(*fns):
+    import inspect
+    return fingerprint(*(inspect.getsource(fn) for fn in fns))
+
+def stage_inputs(stage, upstream):
+    """Fingerprint inputs of a checkpointed stage: the upstream output's
+    digest plus the config (LLM endpoint included, and for build the rules
+    and prompt code) it reads."""
+    if stage == "dedupe":
+        config = [NEAR_DUP_THRESHOLD, MINHASH_BANDS, MINHASH_ROWS, STORY_INDEX, STORY_INDEX_PATH, STORY_INDEX_DAYS,
+                  STORY_REPEATS]
+    elif stage == "translate":
+        config = [TRANSLATE_TO_EN, str(client.base_url), MODEL, TRANSLATE_SCRIPT_SHARE]
+    elif stage == "build":
+        config = [str(client.base_url), MODEL, REASONING, BRIEF_WHY_MODE, _CLASSIFY_RULES, SECTION_CLF, SECTION_CLF_MIN_PROB,
+                  _file_digest(SECTION_CLF_PATH), WHY_GUIDANCE,
+                  _code_digest(write_glance, section_headlines, why_context, _outlets, write_section_brief, other_headlines,
+                               write_other_brief, write_all_whys, _section_job, build_sections, build_brief)]
+    else:
+        raise ValueError(f"unknown stage: {stage}")
+    return [upstream] + config
+
+class Checkpoints:
+    def __init__(self, day, root=WORK_DIR, enabled=RESUME):
+        self.dir = os.path.join(root, day)
+        self.root = root
+        self.enabled = enabled
+        self.resumed = []
+
+    def _path(self, name):
+        return os.path.join(self.dir, name)
+
+    def run(self, name, inputs, fn, keep=None):
+        """(output, digest) of a stage, reused while `inputs` are unchanged.
+        `keep(output)` False means don't checkpoint it (e.g. degraded output),
+        so the next run redoes the stage."""
+        fp = fingerprint(name, inputs)
+        path = self._path(f"{name}.json")
+        if self.enabled:
+            try:
+                with open(path, encoding="utf-8") as f:
+                    saved = json.load(f)
+                if saved.get("fingerprint") == fp:
+                    print(f"[Resume] {name}: reusing checkpoint")
+                    self.resumed.append(name)
+                    return saved["output"], saved["digest"]
+            except (OSError, ValueError, KeyError):
+                pass
+        with stage_timer(name):
+            out = fn()
+        digest = fingerprint(out)
+        if self.enabled and (keep is None or keep(out)):
+            os.makedirs(self.dir, exist_ok=True)
+            with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+                json.dump({"fingerprint": fp, "digest": digest, "output": out}, f, ensure_ascii=False)
+            os.replace(f"{path}.tmp", path)
+        return out, digest
+
+    def once(self, name, fn):
+        """Run a side effect at most once per day; a falsy result isn't recorded."""
+        marker = self._path(f"{name}.done")
+        if self.enabled and os.path.exists(marker):
+            print(f"[Resume] {name}: already done today")
+            return
+        if fn() and self.enabled:
+            os.makedirs(self.dir, exist_ok=True)
+            with open(marker, "w", encoding="utf-8") as f:
+                f.write(datetime.now(timezone.utc).isoformat())
+
+    def prune(self, keep_days=WORK_KEEP_DAYS):
+        """Drop work dirs of days more than keep_days before this one."""
+        import shutil
+        if not os.path.isdir(self.root):
+            return
+        cutoff = (date.fromisoformat(os.path.basename(self.dir)) - timedelta(days=keep_days)).isoformat()
+        for name in os.listdir(self.root):
+            if name < cutoff:
+                shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
 
 # ---------- MAIN ----------
 def main():
@@ -545,40 +2217,88 @@ def main():
     
     # State check
     state = load_state()
-    if state.get("last_run_date") == today and not DRY_RUN:
+    rerun = state.get("last_run_date") == today
+    if rerun and not DRY_RUN and not INCREMENTAL:
         print(f"[SKIP] Already ran for {today}")
         return
+    incremental = rerun and INCREMENTAL
+    watermarks = {p: wm for p, wm in (state.get("watermarks") or {}).items() if wm.get("date") == today}
+    if incremental:
+        print(f"[INCREMENTAL] fetching articles newer than: "
+              + (", ".join(f"{p} {wm.get('latest')}" for p, wm in watermarks.items()) or "(no watermarks)"))
     
     if DRY_RUN:
         print("[DRY RUN] — limited fetch, one section test")
     
-    # Fetch
-    all_items = []
-    if os.getenv("ENABLE_GDELT", "1") == "1":
-        print("[Fetch] GDELT...")
-        all_items.extend(fetch_gdelt(query=GDELT_QUERY, max_records=GDELT_MAXREC if not DRY_RUN else 20))
-    if os.getenv("ENABLE_MARKETAUX", "0") == "1":
-        print("[Fetch] Marketaux...")
-        all_items.extend(safe_fetch_marketaux(MARKETAUX_API_KEY, PER_CALL_LIMIT, 
-                                               TARGET_ARTICLES if not DRY_RUN else 5, 
-                                               {"filter_entities": "true"}))
+    if LLM_CACHE:
+        prune_llm_cache()
+    ck = Checkpoints(today, enabled=RESUME and not DRY_RUN)
+    ck.prune()
+    
+    # Fetch (an incremental run always asks the providers again)
+    fetch_inputs = {"day": today, "dry_run": DRY_RUN, "cache": [FETCH_CACHE_MODE, FETCH_CACHE_DAY],
+                    "gdelt": [os.getenv("ENABLE_GDELT", "1"), GDELT_QUERY, GDELT_MAXREC, GDELT_HOURS_BACK, GDELT_SLICES],
+                    "marketaux": [os.getenv("ENABLE_MARKETAUX", "0"), TARGET_ARTICLES],
+                    "incremental": time.time() if incremental else None}
+    all_items, fetch_digest = ck.run("fetch", fetch_inputs, lambda: fetch_all_sources(
+        dry_run=DRY_RUN, watermarks=watermarks if incremental else None), keep=bool)
     
     print(f"  Fetched: {len(all_items)} articles")
-    all_items = dedupe_items(all_items)
-    print(f"  After dedup: {len(all_items)}")
+    if incremental:
+        all_items = drop_seen(all_items, watermarks)
+        print(f"  New since last run: {len(all_items)}")
+        if not all_items:
+            print("[SKIP] No new articles since the last run.")
+            return
+    else:
+        watermarks = {}
+    raw_path = f"data/raw/{today}.json"
+    new_items = all_items
+    if incremental and os.path.exists(raw_path):
+        # Append to the day's raw set; the brief is rebuilt over everything
+        all_items = load_raw_items(raw_path) + all_items
+        fetch_digest = fingerprint(all_items)
+    
+    # data/raw keeps the fetch as-is (its own copy: translation fills title_en in
+    # place, and a resumed run's items are fresh objects); dedupe and the story
+    # index only shape the brief
+    raw_items = copy.deepcopy(all_items)
+    story_index = StoryIndex.load(today=today) if STORY_INDEX else None
+    
+    def dedupe_stage():
+        items = dedupe_items(all_items)
+        print(f"  After dedup: {len(items)}")
+        if story_index:
+            items = story_index.filter(items, today)
+        return items
+    # the index's earlier days are an input too: a resumed run mustn't reuse a filter made against a stale one
+    dedupe_inputs = stage_inputs("dedupe", fetch_digest) + [story_index.digest(today) if story_index else None]
+    all_items, dedupe_digest = ck.run("dedupe", dedupe_inputs, dedupe_stage)
     
     if not all_items:
         print("[WARN] No articles. Skipping.")
         return
     
+    # LLM stage (translate + build) runs against one wall-clock budget; output
+    # from degraded, skipped or failed calls isn't checkpointed, so a rerun retries it
+    llm_budget.start()
+    
     # Translate
     if TRANSLATE_TO_EN:
         print("[Translate]...")
-        all_items = translate_non_english(all_items)
+    mark = llm_calls_mark()
+    all_items, translate_digest = ck.run("translate", stage_inputs("translate", dedupe_digest),
+                                         lambda: translate_non_english(all_items), keep=lambda _: llm_calls_clean(mark))
+    raw_items = with_translations(raw_items, all_items)
+    
+    # Tag once; build, CSV and site all read the annotated set
+    all_items = annotate_items(all_items)
     
     # Build brief
     print("[Build]...")
-    md_text = build_brief(all_items)
+    mark = llm_calls_mark()
+    md_text, _ = ck.run("build", stage_inputs("build", translate_digest),
+                        lambda: build_brief(all_items), keep=lambda _: llm_calls_clean(mark))
     
     if DRY_RUN:
         print("\n" + "="*60)
@@ -587,24 +2307,35 @@ def main():
         print(md_text[:2000])
         print("... (truncated)")
         print("="*60)
+        print_run_summary(build_run_report(today))
         print("[DRY RUN] — no files written, no state saved")
         return
     
-    # Save outputs
+    # Save outputs (idempotent writes; email goes out once per day)
     print("[Save]...")
-    os.makedirs("out", exist_ok=True)
-    with open(f"out/{today}.md", "w", encoding="utf-8") as f:
-        f.write(md_text)
-    save_json(all_items, today)
-    save_csv(all_items, today)
-    build_static_site(md_text, today)
-    email_brief(today)  # silent no-op if Mailgun not configured
+    with stage_timer("save"):
+        os.makedirs("out", exist_ok=True)
+        with open(f"out/{today}.md", "w", encoding="utf-8") as f:
+            f.write(md_text)
+        save_json(raw_items, today)
+        save_csv(all_items, today)
+        build_static_site(md_text, today)
+        ck.once("email", lambda: email_brief(today))  # silent no-op if Mailgun not configured
+        if story_index:
+            story_index.add_day(today, all_items)
+            story_index.save()
+    
+    # Run report (LLM latency/tokens/cost + stage timings)
+    _run_stats["resumed"] = ck.resumed
+    report = build_run_report(today)
+    save_run_report(report, today)
+    print_run_summary(report)
     
     # Grimoire
-    save_to_grimoire(md_text, today)
+    ck.once("grimoire", lambda: save_to_grimoire(md_text, today))
     
     # State
-    save_state(today)
+    save_state(today, update_watermarks(watermarks, new_items, today))
     print(f"[DONE] Brief for {today} complete.")
 
 if __name__ == "__main__":
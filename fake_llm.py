@@ -0,0 +1,149 @@
+# fake_llm.py — Offline OpenAI-compatible stand-in for chat.completions
+#
+# Answers POST /v1/chat/completions with deterministic, prompt-shaped replies
+# (translations keep their [N] prefix, the single-call mode gets JSON, section
+# prompts get bullets), so main() and bench.py run at production scale with no
+# key and no spend:
+#
+#   python fake_llm.py --port 8765 --latency lognormal:1.0,0.6 --error-rate 0.05 &
+#   LLM_BASE_URL=http://127.0.0.1:8765/v1 OPENROUTER_API_KEY=offline python daily_brief.py
+#
+# Latency specs: fixed:S | uniform:LO,HI | lognormal:MU,SIGMA (seconds; MU/SIGMA
+# of the underlying normal). Errors are drawn from a seeded RNG shared across
+# requests, so a retried request can succeed.
+import re, json, time, math, random, hashlib, argparse, threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class Config:
+    def __init__(self, latency="fixed:0", error_rate=0.0, error_codes=(429, 500, 503),
+                 retry_after=1.0, seed=0):
+        self.latency = parse_latency(latency)
+        self.error_rate = error_rate
+        self.error_codes = tuple(error_codes)
+        self.retry_after = retry_after
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+
+    def draw(self):
+        """(latency seconds, error status or None) for the next request."""
+        with self.lock:
+            self.requests += 1
+            delay = self.latency(self.rng)
+            error = self.rng.choice(self.error_codes) if self.rng.random() < self.error_rate else None
+            return delay, error
+
+def parse_latency(spec):
+    kind, _, args = spec.partition(":")
+    nums = [float(x) for x in args.split(",") if x]
+    if kind == "fixed":
+        return lambda rng: nums[0] if nums else 0.0
+    if kind == "uniform":
+        return lambda rng: rng.uniform(nums[0], nums[1])
+    if kind == "lognormal":
+        return lambda rng: rng.lognormvariate(nums[0], nums[1]) if nums[1] else math.exp(nums[0])
+    raise ValueError(f"unknown latency spec: {spec}")
+
+# ---------- REPLIES ----------
+def _headlines(prompt):
+    return [m.group(1).strip() for m in re.finditer(r"^- (.+)$", prompt, re.M)]
+
+def reply_for(messages):
+    """Deterministic reply shaped like what daily_brief expects for this prompt."""
+    prompt = messages[-1].get("content", "") if messages else ""
+    rng = random.Random(hashlib.sha256(prompt.encode("utf-8")).digest())
+    numbered = re.findall(r"^\[(\d+)\]\s*(?:\([^)]*\)\s*)?(.*)$", prompt, re.M)
+    if numbered:
+        return "\n".join(f"[{n}] {title.strip()}" for n, title in numbered)
+    if "JSON object" in prompt:
+        sections = re.findall(r"^## (.+)$", prompt, re.M)
+        return json.dumps({s: f"- Offline note for {s}: watch follow-through ({rng.randint(1, 9)}% move)."
+                           for s in sections}, ensure_ascii=False)
+    heads = _headlines(prompt) or ["today's headlines"]
+    if "Today at a Glance" in prompt:
+        lines = [l.split(": ", 1)[-1] for l in re.findall(r"^.+?: .+$", prompt.split("by section:")[-1], re.M)]
+        lead = lines[0] if lines else heads[0]
+        return (f"The day is led by {lead}. Watch how markets digest it over the next session. "
+                f"Offline stand-in summary #{rng.randint(100, 999)}.")
+    picks = heads[:rng.randint(2, 4)]
+    return "\n".join(f"- {h.split(' (')[0]} — offline implication #{rng.randint(1, 99)}." for h in picks)
+
+def completion(body):
+    messages = body.get("messages") or []
+    content = reply_for(messages)
+    prompt_tokens = sum(len(m.get("content", "")) for m in messages) // 4 + 1
+    completion_tokens = len(content) // 4 + 1
+    reasoning = int(hashlib.sha256(content.encode("utf-8")).digest()[0]) * 4
+    return {
+        "id": "offline-" + hashlib.sha256(content.encode("utf-8")).hexdigest()[:12],
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "offline"),
+        "choices": [{"index": 0, "finish_reason": "stop",
+                     "message": {"role": "assistant", "content": content}}],
+        "usage": {"prompt_tokens": prompt_tokens,
+                  "completion_tokens": completion_tokens + reasoning,
+                  "total_tokens": prompt_tokens + completion_tokens + reasoning,
+                  "completion_tokens_details": {"reasoning_tokens": reasoning}},
+    }
+
+# ---------- SERVER ----------
+def make_handler(config):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, payload, headers=()):
+            data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for k, v in headers:
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                return self._send(404, {"error": {"message": "not found"}})
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+            delay, error = config.draw()
+            time.sleep(delay)
+            if error:
+                headers = [("Retry-After", f"{config.retry_after:g}")] if error == 429 else []
+                return self._send(error, {"error": {"message": f"injected {error}", "code": error}}, headers)
+            self._send(200, completion(body))
+    return Handler
+
+def serve(config, host="127.0.0.1", port=8765):
+    server = ThreadingHTTPServer((host, port), make_handler(config))
+    server.daemon_threads = True
+    return server
+
+def serve_in_thread(config=None, host="127.0.0.1", port=0):
+    """Start the stand-in on a background thread; return its base URL."""
+    server = serve(config or Config(), host, port)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://{host}:{server.server_address[1]}/v1"
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline OpenAI-compatible LLM stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", default="fixed:0", help="fixed:S | uniform:LO,HI | lognormal:MU,SIGMA")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests that fail")
+    parser.add_argument("--error-codes", default="429,500,503")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After sent with 429s")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    config = Config(args.latency, args.error_rate, [int(c) for c in args.error_codes.split(",")],
+                    args.retry_after, args.seed)
+    server = serve(config, args.host, args.port)
+    print(f"[fake_llm] listening on http://{args.host}:{args.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
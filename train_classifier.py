@@ -0,0 +1,135 @@
+# train_classifier.py — Train the optional section classifier from out/*.csv
+#
+#   python train_classifier.py                    # train on every archived CSV, write models/section_clf.npz
+#   python train_classifier.py --holdout 0.2 --epochs 8
+#
+# The model (~1.3 MB at the default 2^18 buckets) is local and not committed;
+# runs use it only with SECTION_CLF=1. Fewer --features makes a smaller file
+# at some cost in agreement.
+# Labels come from the keyword rules only: the CSV's section column where the
+# row says the rules set it (section_by=rules), otherwise the rules re-run on
+# the title. Sections the model itself assigned are never trained on, so
+# retraining doesn't feed on its own output. "Other" is
+# learned as a class of its own (subsampled, it dwarfs the rest) so titles with
+# no section signal stay there; at run time only confident named-section
+# predictions move an "Other" headline.
+# The most recent days are held out to report agreement with the regex tagger,
+# how many held-out "Other" headlines would be moved, and batch throughput.
+import os, csv, sys, glob, time, argparse
+import daily_brief as db
+
+if db.np is None:
+    sys.exit("train_classifier.py needs numpy (pip install numpy)")
+np = db.np
+
+def load_rows(pattern="out/*.csv"):
+    """[(day, title, label)] for every archived headline, first sighting per title."""
+    rows, seen = [], set()
+    for path in sorted(glob.glob(pattern)):
+        day = os.path.basename(path)[:10]
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                title = (row.get("title_en") or row.get("title") or "").strip()
+                key = title.lower()
+                if not title or key in seen:
+                    continue
+                seen.add(key)
+                # older CSVs have no section_by and may hold model-assigned sections
+                label = row["section"] if row.get("section_by") == "rules" else db.classify_title(title)
+                if label != "noise":
+                    rows.append((day, title, label))
+    return rows
+
+def train(titles, labels, classes, n_features, epochs, lr, l2, batch, seed=0):
+    index = {c: k for k, c in enumerate(classes)}
+    y = np.array([index[l] for l in labels])
+    weights = np.zeros((n_features, len(classes)), dtype=np.float32)
+    bias = np.zeros(len(classes), dtype=np.float32)
+    # Adagrad: rare buckets keep a large step, frequent ones settle
+    g_weights = np.full_like(weights, 1e-8)
+    g_bias = np.full_like(bias, 1e-8)
+    rng = np.random.default_rng(seed)
+    for epoch in range(epochs):
+        order = rng.permutation(len(titles))
+        loss = 0.0
+        for i in range(0, len(order), batch):
+            idx = order[i:i + batch]
+            X, buckets = db.feature_matrix([titles[j] for j in idx], n_features)
+            s = X @ weights[buckets] + bias
+            e = np.exp(s - s.max(axis=1, keepdims=True))
+            p = e / e.sum(axis=1, keepdims=True)
+            loss -= np.log(p[np.arange(len(idx)), y[idx]] + 1e-9).sum()
+            p[np.arange(len(idx)), y[idx]] -= 1.0
+            grad = X.T @ p / len(idx) + l2 * weights[buckets]
+            g_weights[buckets] += grad * grad
+            weights[buckets] -= lr * grad / np.sqrt(g_weights[buckets])
+            grad_bias = p.mean(axis=0)
+            g_bias += grad_bias * grad_bias
+            bias -= lr * grad_bias / np.sqrt(g_bias)
+        print(f"  epoch {epoch + 1}: loss {loss / len(titles):.4f}")
+    return db.SectionClassifier(weights, bias, classes)
+
+def report(clf, test, min_prob):
+    named = [(t, l) for _, t, l in test if l != "Other"]
+    other = [t for _, t, l in test if l == "Other"]
+    if named:
+        preds = clf.predict([t for t, _ in named])
+        agree = sum(p == l for (p, _), (_, l) in zip(preds, named))
+        confident = [(p, l) for (p, prob), (_, l) in zip(preds, named) if p != "Other" and prob >= min_prob]
+        print(f"held-out named:   {len(named)} headlines, {agree / len(named):.1%} agree with the regex tagger")
+        print(f"  at p>={min_prob:g}:     {len(confident) / len(named):.1%} covered, "
+              f"{sum(p == l for p, l in confident) / max(1, len(confident)):.1%} agree")
+    if other:
+        moved = sum(label != "Other" and prob >= min_prob for label, prob in clf.predict(other))
+        print(f"held-out Other:   {len(other)} headlines, {moved} ({moved / len(other):.1%}) would be reassigned")
+    titles = [t for _, t, _ in test] or ["empty"]
+    started = time.perf_counter()
+    clf.predict(titles)
+    model_rate = len(titles) / (time.perf_counter() - started)
+    started = time.perf_counter()
+    for t in titles:
+        db.classify_title(t)
+    regex_rate = len(titles) / (time.perf_counter() - started)
+    print(f"throughput:       {model_rate:,.0f} titles/s batched (regex tagger {regex_rate:,.0f} titles/s)")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the hashed linear section classifier")
+    parser.add_argument("--csv", default="out/*.csv", help="glob of archived CSVs")
+    parser.add_argument("--out", default=db.SECTION_CLF_PATH)
+    parser.add_argument("--features", type=int, default=1 << 18, help="hash buckets (power of two)")
+    parser.add_argument("--epochs", type=int, default=4)
+    parser.add_argument("--lr", type=float, default=1.0)
+    parser.add_argument("--l2", type=float, default=1e-6)
+    parser.add_argument("--batch", type=int, default=256)
+    parser.add_argument("--other-ratio", type=float, default=0.5, help="'Other' rows kept per named row")
+    parser.add_argument("--holdout", type=float, default=0.15, help="fraction of the most recent days held out")
+    parser.add_argument("--min-prob", type=float, default=db.SECTION_CLF_MIN_PROB)
+    args = parser.parse_args(argv)
+    if args.features & (args.features - 1):
+        parser.error("--features must be a power of two")
+
+    rows = load_rows(args.csv)
+    days = sorted({d for d, _, _ in rows})
+    cut = days[-max(1, int(len(days) * args.holdout))] if args.holdout > 0 and len(days) > 1 else None
+    train_rows = [r for r in rows if cut is None or r[0] < cut]
+    named = [r for r in train_rows if r[2] != "Other"]
+    other = [r for r in train_rows if r[2] == "Other"]
+    keep = int(len(named) * args.other_ratio)
+    if len(other) > keep:
+        other = [other[i] for i in sorted(np.random.default_rng(0).choice(len(other), keep, replace=False))]
+    train_rows = named + other
+    test = [r for r in rows if cut is not None and r[0] >= cut]
+    if not named:
+        sys.exit("no labelled headlines to train on")
+    classes = [s for s in db.SECTION_ORDER if any(l == s for _, _, l in train_rows)]
+    print(f"[Train] {len(rows)} headlines over {len(days)} days; training on {len(named)} named + "
+          f"{len(other)} 'Other', {len(test)} held out from {cut or '-'}")
+    clf = train([t for _, t, _ in train_rows], [l for _, _, l in train_rows], classes,
+                args.features, args.epochs, args.lr, args.l2, args.batch)
+    if test:
+        report(clf, test, args.min_prob)
+    clf.save(args.out)
+    print(f"[Train] wrote {args.out} ({os.path.getsize(args.out) / 1024:.0f} KB, {len(classes)} classes)")
+
+if __name__ == "__main__":
+    main()